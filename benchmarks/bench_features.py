@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+@author: Nikolaos Giakoumoglou
+@date: Sun Oct 18 19:03:37 2026
+==============================================================================
+Feature benchmark: time and memory-profile every feature of pyfeats.__all__
+over image sizes, ROI fill ratios and key parameters, and write the results
+as json so that runs of different versions can be compared.
+
+    python benchmarks/bench_features.py --output results.json
+    python benchmarks/bench_features.py --functions glrlm_features glszm_features --sizes 64 256
+    python benchmarks/bench_features.py --output new.json --compare old.json
+
+Internal hot spots are measured through the feature that runs them, e.g. _dca
+through amfm_features and _opening_FP through grayscale_morphology_features.
+Once a case takes longer than --max-seconds, its larger sizes are skipped.
+==============================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import itertools
+import warnings
+import tracemalloc
+import subprocess
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import pyfeats
+
+SIZES = [64, 128, 256, 512, 1024, 2048]
+FILLS = [0.25, 0.5, 1.0]
+BATCH = 8
+
+def image(size, seed=0):
+    '''
+    Smoothed noise texture, uint8 of dimensions size x size.
+    '''
+    rng = np.random.default_rng(seed)
+    f = rng.random((size, size))
+    for _ in range(2):
+        f = (f + np.roll(f,1,0) + np.roll(f,-1,0) + np.roll(f,1,1) + np.roll(f,-1,1)) / 5
+    f = (f - f.min()) / (f.max() - f.min())
+    return (255 * f).astype(np.uint8)
+
+def mask(size, fill):
+    '''
+    Centered ellipse covering about fill of the image, and its perimeter.
+    '''
+    if fill >= 1:
+        m = np.ones((size, size), np.int32)
+    else:
+        y, x = np.mgrid[:size,:size] - (size - 1) / 2
+        a = size / 2
+        b = fill * size * size / (np.pi * a)
+        m = ((x / a)**2 + (y / b)**2 <= 1).astype(np.int32)
+    inner = m.copy()
+    inner[1:-1,1:-1] = m[1:-1,1:-1] & m[:-2,1:-1] & m[2:,1:-1] & m[1:-1,:-2] & m[1:-1,2:]
+    inner[[0,-1],:] = 0
+    inner[:,[0,-1]] = 0
+    return m, m - inner
+
+def _stack(f, m):
+    return np.stack([np.roll(f, k, 0) for k in range(BATCH)]), np.stack([m] * BATCH)
+
+# name: (call(f, mask, perimeter, **params), parameter grid, uses mask)
+CASES = {
+    'fos': (lambda f, m, p: pyfeats.fos(f, m), {}, True),
+    'fos_batch': (lambda f, m, p: pyfeats.fos_batch(*_stack(f, m)), {}, True),
+    'glcm_features': (lambda f, m, p: pyfeats.glcm_features(f, ignore_zeros=True, mask=m), {}, True),
+    'glcm_sparse': (lambda f, m, p: pyfeats.glcm_sparse(f, m), {}, True),
+    'glcm_features_batch': (lambda f, m, p: pyfeats.glcm_features_batch(*_stack(f, m)), {}, True),
+    'glcm_features_tiled': (lambda f, m, p, tile_size: pyfeats.glcm_features_tiled(f, m, tile_size=tile_size),
+                            {'tile_size': [256, 1024]}, True),
+    'glds_features': (lambda f, m, p: pyfeats.glds_features(f, m), {}, True),
+    'glds_features_batch': (lambda f, m, p: pyfeats.glds_features_batch(*_stack(f, m)), {}, True),
+    'ngtdm_features': (lambda f, m, p, d: pyfeats.ngtdm_features(f, m, d=d), {'d': [1, 2]}, True),
+    'sfm_features': (lambda f, m, p, L: pyfeats.sfm_features(f, m, Lr=L, Lc=L), {'L': [4, 8]}, True),
+    'lte_measures': (lambda f, m, p, l: pyfeats.lte_measures(f, m, l=l), {'l': [3, 7]}, True),
+    'lte_measures_batch': (lambda f, m, p, l: pyfeats.lte_measures_batch(*_stack(f, m), l=l), {'l': [7]}, True),
+    'fdta': (lambda f, m, p, s: pyfeats.fdta(f, m, s=s), {'s': [3]}, True),
+    'glrlm_features': (lambda f, m, p, Ng: pyfeats.glrlm_features(f.astype(np.int32) * Ng // 256, m, Ng=Ng), {'Ng': [16, 64, 256]}, True),
+    'glrlm_compact': (lambda f, m, p, Ng: pyfeats.glrlm_compact(f.astype(np.int32) * Ng // 256, m, Ng=Ng), {'Ng': [16, 256]}, True),
+    'fps': (lambda f, m, p: pyfeats.fps(f, m), {}, True),
+    'shape_parameters': (lambda f, m, p: pyfeats.shape_parameters(f, m, p), {}, True),
+    'hos_features': (lambda f, m, p: pyfeats.hos_features(f, th=[135,140]), {}, False),
+    'lbp_features': (lambda f, m, p, PR: pyfeats.lbp_features(f, m, P=PR[0], R=PR[1]),
+                     {'PR': [([8], [1]), ([8,16,24], [1,2,3])]}, True),
+    'glszm_features': (lambda f, m, p: pyfeats.glszm_features(f, m), {}, True),
+    'glszm_triplets': (lambda f, m, p: pyfeats.glszm_triplets(f, m), {}, True),
+    'grayscale_morphology_features': (lambda f, m, p, N: pyfeats.grayscale_morphology_features(f, N=N), {'N': [10, 30]}, False),
+    'multilevel_binary_morphology_features': (lambda f, m, p, N: pyfeats.multilevel_binary_morphology_features(f, m, N=N), {'N': [10, 30]}, True),
+    'histogram': (lambda f, m, p, bins: pyfeats.histogram(f, m, bins=bins), {'bins': [32, 256]}, True),
+    'histogram_batch': (lambda f, m, p: pyfeats.histogram_batch(*_stack(f, m)), {}, True),
+    'multiregion_histogram': (lambda f, m, p, num_eros: pyfeats.multiregion_histogram(f, m, num_eros=num_eros), {'num_eros': [3]}, True),
+    'correlogram': (lambda f, m, p, bins: pyfeats.correlogram(f, m, bins_digitize=bins, bins_hist=bins), {'bins': [32]}, True),
+    'dwt_features': (lambda f, m, p, levels: pyfeats.dwt_features(f, m, levels=levels), {'levels': [1, 3, 5]}, True),
+    'dwt_features_batch': (lambda f, m, p: pyfeats.dwt_features_batch(*_stack(f, m)), {}, True),
+    'swt_features': (lambda f, m, p, levels: pyfeats.swt_features(f, m, levels=levels), {'levels': [1, 3]}, True),
+    'wp_features': (lambda f, m, p, maxlevel: pyfeats.wp_features(f, m, maxlevel=maxlevel), {'maxlevel': [1, 3]}, True),
+    'gt_features': (lambda f, m, p, deg: pyfeats.gt_features(f, m, deg=deg), {'deg': [4]}, True),
+    'gt_features_batch': (lambda f, m, p: pyfeats.gt_features_batch(*_stack(f, m)), {}, True),
+    'amfm_features': (lambda f, m, p, bins: pyfeats.amfm_features(f, bins=bins), {'bins': [32]}, False),
+    'hog_features': (lambda f, m, p, ppc: pyfeats.hog_features(f, ppc=ppc, cpb=3), {'ppc': [8]}, False),
+    'hu_moments': (lambda f, m, p: pyfeats.hu_moments(f), {}, False),
+    'hu_moments_batch': (lambda f, m, p: pyfeats.hu_moments_batch(_stack(f, m)[0]), {}, False),
+    'tas_features': (lambda f, m, p: pyfeats.tas_features(f), {}, False),
+    'zernikes_moments': (lambda f, m, p, radius: pyfeats.zernikes_moments(f, radius=radius), {'radius': [9]}, False),
+    'zernikes_moments_batch': (lambda f, m, p: pyfeats.zernikes_moments_batch(_stack(f, m)[0]), {}, False),
+}
+
+def _grid(params):
+    names = sorted(params)
+    for values in itertools.product(*[params[name] for name in names]):
+        yield dict(zip(names, values))
+
+def _n_features(out):
+    if isinstance(out, tuple):
+        return int(sum(np.size(o) for o in out if isinstance(o, np.ndarray)))
+    return int(np.size(out))
+
+def measure(call, f, m, p, params, repeat=3, memory=True):
+    '''
+    Returns
+    -------
+    result : dict
+        Best and all wall times (s), peak traced allocation (bytes) and
+        number of features of call(f, m, p, **params).
+    '''
+    times = []
+    for i in range(repeat):
+        t = time.perf_counter()
+        out = call(f, m, p, **params)
+        times.append(time.perf_counter() - t)
+        if times[-1] > 1: # slow cases are timed once
+            break
+    result = {'time': min(times), 'times': times, 'n_features': _n_features(out)}
+    if memory:
+        tracemalloc.start()
+        call(f, m, p, **params)
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+def _meta():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'commit': commit,
+            'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(),
+            'cpus': os.cpu_count()}
+
+def _key(r):
+    return (r['function'], r['size'], r['fill'], json.dumps(r['params'], sort_keys=True))
+
+def compare(results, old):
+    '''
+    Print time and memory ratio new / old of cases in both runs.
+    '''
+    old = {_key(r): r for r in old['results'] if 'time' in r}
+    print('\n%-40s %6s %5s %-22s %8s %8s' % ('function', 'size', 'fill', 'params', 'time', 'memory'))
+    for r in results:
+        o = old.get(_key(r))
+        if o is None or 'time' not in r:
+            continue
+        mem = ''
+        if 'peak_bytes' in r and 'peak_bytes' in o and o['peak_bytes'] > 0:
+            mem = '%.2fx' % (r['peak_bytes'] / o['peak_bytes'])
+        print('%-40s %6d %5.2f %-22s %7.2fx %8s' % (r['function'], r['size'], r['fill'],
+              json.dumps(r['params'])[:22], r['time'] / o['time'], mem))
+
+def main():
+    parser = argparse.ArgumentParser(description='Feature benchmark')
+    parser.add_argument('--functions', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--fills', nargs='+', type=float, default=FILLS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-seconds', type=float, default=30,
+                        help='skip larger sizes of a case slower than this (default: 30)')
+    parser.add_argument('--no-memory', action='store_true', help='do not trace allocations')
+    parser.add_argument('--output', help='json file of results')
+    parser.add_argument('--compare', help='json file of a previous run')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    skipped = sorted(set(pyfeats.__all__) - set(CASES))
+    print('not benchmarked: ' + ', '.join(skipped))
+    results = []
+    for name in args.functions:
+        call, grid, masked = CASES[name]
+        fills = args.fills if masked else [1.0]
+        for params, fill in itertools.product(list(_grid(grid)), fills):
+            # Warm up: lazy imports and caches are not part of the timings
+            f = image(32)
+            call(f, *mask(32, fill), **params)
+            too_slow = False
+            for size in sorted(args.sizes):
+                case = {'function': name, 'size': size, 'fill': fill, 'params': params}
+                if too_slow:
+                    case['skipped'] = True
+                    results.append(case)
+                    continue
+                f = image(size)
+                m, p = mask(size, fill)
+                case.update(measure(call, f, m, p, params, args.repeat, not args.no_memory))
+                results.append(case)
+                too_slow = case['time'] > args.max_seconds
+                print('%-40s %6d %5.2f %-22s %10.4fs %10s' % (name, size, fill, json.dumps(params)[:22],
+                      case['time'], '%.1fMB' % (case['peak_bytes'] / 2**20) if 'peak_bytes' in case else ''),
+                      flush=True)
+
+    if args.output is not None:
+        with open(args.output, 'w') as fp:
+            json.dump({'meta': _meta(), 'results': results}, fp, indent=1)
+    if args.compare is not None:
+        with open(args.compare) as fp:
+            compare(results, json.load(fp))
+
+if __name__ == '__main__':
+    main()
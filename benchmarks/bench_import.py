@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+@author: Nikolaos Giakoumoglou
+@date: Sun Oct 18 18:22:10 2026
+==============================================================================
+Import time benchmark: time `import pyfeats` and the first use of some
+features, each in a fresh interpreter, and list the heavy dependencies that
+got loaded.
+
+    python benchmarks/bench_import.py [--repeat 5]
+==============================================================================
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ['matplotlib', 'cv2', 'mahotas', 'skimage', 'scipy', 'pywt']
+
+CASES = {
+    'import pyfeats': 'import pyfeats',
+    'fos, glcm_features': 'import pyfeats; pyfeats.fos; pyfeats.glcm_features',
+    'FeatureExtractor': 'import pyfeats; pyfeats.FeatureExtractor',
+    'all features': 'import pyfeats; [getattr(pyfeats, name) for name in pyfeats.__all__]',
+}
+
+SCRIPT = '''
+import sys, time, json
+t = time.perf_counter()
+{statement}
+t = time.perf_counter() - t
+print(json.dumps([t, [m for m in {heavy!r} if m in sys.modules]]))
+'''
+
+def run(statement):
+    script = SCRIPT.format(statement=statement, heavy=HEAVY)
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    out = subprocess.run([sys.executable, '-c', script], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time benchmark')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run('import pyfeats') # warm the file cache and bytecode
+    for name, statement in CASES.items():
+        results = [run(statement) for _ in range(args.repeat)]
+        t = sorted(r[0] for r in results)[len(results)//2]
+        print('%-20s %8.1f ms   loaded: %s' % (name, 1000*t, ', '.join(results[0][1]) or '-'))
+
+if __name__ == '__main__':
+    main()
@@ -1,35 +1,59 @@
-from .histogram import *
-from .textural import *
-from .morphological import *
-from .multiscale import *
-from .other import *
+# Subpackages import the dependencies of a feature only when it is first used,
+# so that e.g. pyfeats.fos does not load matplotlib, OpenCV or mahotas.
+import importlib
+from ._lazy import attach
 
-__all__ = ['histogram', 'plot_histogram',
+__version__ = '1.0.11'
+
+from .histogram import histogram, multiregion_histogram, correlogram
+from .textural import fos, fps
+from .multiscale import fdta
+
+__all__ = ['histogram', 'histogram_batch', 'plot_histogram',
            'multiregion_histogram',
            'correlogram', 'plot_correlogram',
-           'fos',
-           'glcm_features',
-           'glds_features',
+           'fos', 'fos_batch',
+           'glcm_matrices', 'glcm_features', 'glcm_features_batch', 'haralick_features',
+           'glcm_sparse', 'haralick_features_sparse',
+           'GLCMAccumulator', 'glcm_tiles', 'glcm_features_tiled',
+           'glds_features', 'glds_features_batch',
            'ngtdm_features',
            'sfm_features',
-           'lte_measures',
+           'lte_measures', 'lte_measures_batch',
            'fdta',
-           'glrlm_features',
+           'glrlm_features', 'glrlm_compact',
            'fps',
            'shape_parameters',
            'hos_features','plot_sinogram',
            'lbp_features',
-           'glszm_features',
+           'glszm_features', 'glszm_triplets',
            'grayscale_morphology_features','plot_pdf_cdf',
            'multilevel_binary_morphology_features','plot_pdfs_cdfs',
            'fdta',
-           'dwt_features',
+           'dwt_features', 'dwt_features_batch',
            'swt_features', 
            'wp_features', 
-           'gt_features', 
+           'gt_features', 'gt_features_batch',
            'amfm_features',
            'hog_features', 'plot_hog',
-           'hu_moments',
+           'hu_moments', 'hu_moments_batch',
            'tas_features',
-           'zernikes_moments']
+           'zernikes_moments', 'zernikes_moments_batch',
+           'FeatureExtractor', 'FeatureContext',
+           'run_dataset',
+           'profile',
+           'FeatureCache',
+           'FeatureStore']
+
+_modules = {'FeatureExtractor': '.extractor',
+            'FeatureContext': '.extractor',
+            'run_dataset': '.parallel',
+            'profile': '.profiling',
+            'FeatureCache': '.cache',
+            'FeatureStore': '.store'}
+for _package in ('.histogram', '.textural', '.morphological', '.multiscale', '.other'):
+    for _name in importlib.import_module(_package, __name__).__all__:
+        _modules.setdefault(_name, _package)
+del _package, _name
 
+__getattr__, __dir__ = attach(__name__, _modules)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+@author: Nikolaos Giakoumoglou
+@date: Sun Oct 18 23:40:05 2026
+==============================================================================
+Lazy attributes of the pyfeats packages: a feature is imported from its
+module on first access, so that e.g. pyfeats.fos does not load matplotlib,
+OpenCV or mahotas.
+
+    __getattr__, __dir__ = attach(__name__, {'glcm_features': '.glcm'})
+==============================================================================
+"""
+
+import sys
+import importlib
+
+def attach(package, modules, computed=None):
+    '''
+    Parameters
+    ----------
+    package : str
+        Name of the package (its __name__).
+    modules : dict
+        Attribute name -> module it is imported from, relative to package.
+        Other names are imported as submodules of package, e.g.
+        pyfeats.textural.glcm.
+    computed : dict, optional
+        Attribute name -> function computing its value on first access. The
+        default is None.
+
+    Returns
+    -------
+    __getattr__, __dir__ : function
+        Module functions to be bound in the package.
+    '''
+    computed = computed or {}
+
+    def __getattr__(name):
+        # Import the module of a feature on first access
+        if name in computed:
+            value = computed[name]()
+        elif name in modules:
+            value = getattr(importlib.import_module(modules[name], package), name)
+        else:
+            try:
+                value = importlib.import_module('.' + name, package)
+            except ModuleNotFoundError as e:
+                if e.name != package + '.' + name:
+                    raise
+                raise AttributeError('module ' + repr(package) + ' has no attribute ' +
+                                     repr(name)) from None
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        module = sys.modules[package]
+        return sorted(set(vars(module)) | set(getattr(module, '__all__', [])) | set(computed))
+
+    return __getattr__, __dir__
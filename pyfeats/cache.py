@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+@author: Nikolaos Giakoumoglou
+@date: Sun Oct 18 21:08:26 2026
+==============================================================================
+Content-addressed feature cache: features of each family are stored on disk
+under a hash of the image and mask bytes, the family, its parameters and the
+pyfeats version, so unchanged families of unchanged images are never
+recomputed. Least recently used entries are evicted above a size bound.
+
+    cache = pyfeats.FeatureCache('~/.cache/pyfeats', max_bytes=2**30)
+    extractor = pyfeats.FeatureExtractor(config, cache=cache)
+
+With intermediates=True, expensive intermediates (GLRLM and GLSZM matrices,
+AM-FM reconstructed images) are cached too, and reused when only later
+parameters change.
+==============================================================================
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import contextvars
+import numpy as np
+
+__all__ = ['FeatureCache', 'intermediate']
+
+# Cache used for intermediates, set while a FeatureCache is entered; a 
+# context variable, so threads and tasks each see the cache they entered
+_active = contextvars.ContextVar('pyfeats_cache', default=None)
+
+def _update(h, part):
+    # Hash arrays by dtype, shape and bytes, also inside dicts, lists and 
+    # tuples; anything else must be plain JSON
+    if isinstance(part, np.generic):
+        part = part.item() # numpy scalars hash as the Python value
+    if isinstance(part, np.ndarray):
+        part = np.ascontiguousarray(part)
+        h.update(('array:' + part.dtype.str + ':' + str(part.shape) + ':').encode())
+        h.update(part.data)
+    elif isinstance(part, bytes):
+        h.update(b'bytes:' + part)
+    elif isinstance(part, dict):
+        keys = {}
+        for k in part:
+            if not (k is None or isinstance(k, (bool, int, float, str))):
+                raise TypeError('Cannot hash dict key of type ' + type(k).__name__)
+            keys[json.dumps(k)] = k
+        h.update(('dict:' + str(len(keys)) + ':').encode())
+        for name in sorted(keys):
+            h.update(name.encode() + b'=')
+            _update(h, part[keys[name]])
+    elif isinstance(part, (list, tuple)):
+        h.update(('list:' + str(len(part)) + ':').encode())
+        for item in part:
+            _update(h, item)
+    elif part is None or isinstance(part, (bool, int, float, str)):
+        h.update(('json:' + json.dumps(part)).encode())
+    else:
+        raise TypeError('Cannot hash ' + type(part).__name__ + ' in a cache key')
+    h.update(b';')
+
+class FeatureCache:
+    '''
+    Parameters
+    ----------
+    directory : str
+        Cache directory. It is created if it does not exist.
+    max_bytes : int, optional
+        Size bound of the directory; least recently used entries are removed
+        above it. The default is 2**30 (1 GB).
+    intermediates : bool, optional
+        Cache expensive intermediates too. The default is False.
+    '''
+
+    def __init__(self, directory, max_bytes=2**30, intermediates=False):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_bytes = max_bytes
+        self.intermediates = intermediates
+        self._size = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, *parts):
+        '''
+        Hash of the pyfeats version and parts (arrays, bytes or json-like).
+        '''
+        from . import __version__
+        h = hashlib.sha256()
+        _update(h, __version__)
+        for part in parts:
+            _update(h, part)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.npz')
+
+    def load(self, key):
+        '''
+        Returns
+        -------
+        arrays : dict
+            Arrays stored under key, or None if there are none.
+        '''
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+            os.utime(path) # most recently used
+        except Exception:
+            return None
+        return arrays
+
+    def save(self, key, **arrays):
+        '''
+        Store arrays under key; written atomically, so concurrent processes
+        may share the directory.
+        '''
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                np.savez_compressed(fp, **arrays)
+            try:
+                replaced = os.path.getsize(path) # entry overwritten, if any
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += os.path.getsize(path) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def get_features(self, key):
+        '''
+        Returns
+        -------
+        features, labels : numpy ndarray, list
+            Features stored under key, or None if there are none.
+        '''
+        arrays = self.load(key)
+        if arrays is None:
+            return None
+        return arrays['features'], arrays['labels'].tolist()
+
+    def put_features(self, key, features, labels):
+        self.save(key, features=np.asarray(features), labels=np.array(labels, dtype=str))
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.npz'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def size(self):
+        '''
+        Total size of cached entries in bytes.
+        '''
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_bytes=None):
+        '''
+        Remove least recently used entries until the cache takes at most 90%
+        of max_bytes (default: the size bound of the cache).
+        '''
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = sorted(self._entries())
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= 0.9 * max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
+
+    def clear(self):
+        self.evict(0)
+
+    def __enter__(self):
+        # Cache intermediates of features computed inside the with block. 
+        # Tokens are kept per thread, so the cache may be entered again, 
+        # nested or from other threads at the same time.
+        if '_tokens' not in self.__dict__:
+            self._tokens = threading.local()
+        stack = self._tokens.__dict__.setdefault('stack', [])
+        stack.append(_active.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _active.reset(self._tokens.stack.pop())
+        return False
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_tokens', None)
+        return state
+
+def intermediate(name, compute, *parts):
+    '''
+    Value of compute(), an array or a tuple of arrays, read from the active
+    cache under name and parts (the inputs it depends on) when the cache
+    stores intermediates.
+    '''
+    cache = _active.get()
+    if cache is None or not cache.intermediates:
+        return compute()
+    key = cache.key('intermediate', name, *parts)
+    arrays = cache.load(key)
+    if arrays is not None:
+        if 'value' in arrays:
+            return arrays['value']
+        return tuple(arrays['value' + str(i)] for i in range(len(arrays)))
+    value = compute()
+    if isinstance(value, tuple):
+        value = tuple(np.asarray(v) for v in value)
+        cache.save(key, **{'value' + str(i): v for i, v in enumerate(value)})
+    else:
+        value = np.asarray(value)
+        cache.save(key, value=value)
+    return value
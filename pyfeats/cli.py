@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+@author: Nikolaos Giakoumoglou
+@date: Sun Oct 18 17:05:48 2026
+==============================================================================
+Command line batch extractor:
+
+    python -m pyfeats extract --images DIR [--masks DIR] --output out.csv
+    python -m pyfeats extract --manifest list.csv --output out.csv
+
+Masks are images (nonzero is ROI) or polygon point files in the format of
+demo/data/points.out. Each row of the output (image name and features) is
+written as soon as the image is done, so the output is also the checkpoint:
+with --resume, images already in the output are skipped, and the features
+must have the labels of the output. An output ending in .npy is a
+memory-mapped FeatureStore with a row per image instead of csv. With
+--profile, the time and memory of each feature family and stage of each image
+are written to another csv file.
+==============================================================================
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+__all__ = ['main']
+
+IMAGE_EXTENSIONS = ('.bmp', '.png', '.jpg', '.jpeg', '.tif', '.tiff')
+POINTS_EXTENSIONS = ('.out', '.txt')
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def _find_mask(masks_dir, stem):
+    for ext in POINTS_EXTENSIONS + IMAGE_EXTENSIONS:
+        path = os.path.join(masks_dir, stem + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def _list_directory(images_dir, masks_dir=None):
+    '''
+    Returns
+    -------
+    items : list
+        (name, image path, mask path or None) of each image in images_dir.
+    '''
+    items = []
+    for name in sorted(os.listdir(images_dir)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        mask = None if masks_dir is None else _find_mask(masks_dir, _stem(name))
+        items.append((name, os.path.join(images_dir, name), mask))
+    return items
+
+def _list_manifest(manifest):
+    '''
+    Manifest is a csv file with columns image, and optionally mask and name.
+    Relative paths are relative to the directory of the manifest.
+    '''
+    root = os.path.dirname(os.path.abspath(manifest))
+    items = []
+    with open(manifest, newline='') as fp:
+        for row in csv.DictReader(fp):
+            image = os.path.join(root, row['image'])
+            mask = row.get('mask') or None
+            if mask is not None:
+                mask = os.path.join(root, mask)
+            items.append((row.get('name') or row['image'], image, mask))
+    return items
+
+def load_image(path):
+    '''
+    Load a grayscale image.
+    '''
+    import cv2
+    f = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if f is None:
+        raise IOError('Cannot read image ' + path)
+    return f
+
+def load_mask(path, shape):
+    '''
+    Load a mask as (mask, perimeter). Polygon point files give the filled
+    polygon and its outline as in the demo; mask images give their nonzero
+    pixels and no perimeter. No path means the whole image.
+    '''
+    import cv2
+    if path is None:
+        return np.ones(shape, np.int32), None
+    if path.lower().endswith(POINTS_EXTENSIONS):
+        points = np.array(np.loadtxt(path, delimiter=','), np.int32).reshape((-1,1,2))
+        mask = cv2.fillPoly(np.zeros(shape, np.double), [points], color=1).astype('i')
+        perimeter = cv2.polylines(np.zeros(shape), [points], isClosed=True,
+                                  color=1, thickness=1).astype('i')
+        return mask, perimeter
+    mask = load_image(path)
+    if mask.shape != tuple(shape):
+        raise ValueError('Mask ' + path + ' does not match the image size')
+    return (mask != 0).astype(np.int32), None
+
+# Per-worker extractor, set by _init_worker
+_worker = {}
+
+def _init_worker(extractor, profiling=None):
+    _worker['extractor'] = extractor
+    _worker['profiling'] = profiling
+
+def _extract(name, image, mask):
+    f = load_image(image)
+    mask, perimeter = load_mask(mask, f.shape)
+    if _worker['profiling'] is None:
+        features, labels = _worker['extractor'].extract(f, mask, perimeter)
+        return name, features, labels, None
+    from .profiling import profile
+    with profile(memory=_worker['profiling'] == 'memory') as prof:
+        features, labels = _worker['extractor'].extract(f, mask, perimeter)
+    return name, features, labels, prof.summary()
+
+def _completed_rows(output):
+    '''
+    Names already in output and its header. A last line cut by a killed run
+    is removed from the file.
+    '''
+    with open(output, 'rb+') as fp:
+        data = fp.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            fp.truncate(end)
+            data = data[:end]
+    lines = data.decode().splitlines()
+    if len(lines) == 0:
+        return set(), None
+    header = next(csv.reader([lines[0]]))
+    done = set(row[0] for row in csv.reader(lines[1:]) if row)
+    return done, header
+
+class _CsvOutput:
+    # Rows appended in order of completion
+    def __init__(self, path, resume):
+        self.done, self.header = set(), None
+        if os.path.exists(path):
+            if not resume:
+                raise FileExistsError(path + ' exists; use --resume to continue it')
+            self.done, self.header = _completed_rows(path)
+        self.path = path
+        self.fp = open(path, 'a', newline='')
+        self.writer = csv.writer(self.fp)
+
+    def write(self, name, features, labels):
+        if self.header is None:
+            self.header = ['name'] + list(labels)
+            self.writer.writerow(self.header)
+        elif self.header != ['name'] + list(labels):
+            raise ValueError('Labels of ' + name + ' do not match the header of ' + self.path)
+        self.writer.writerow([name] + ['%.17g' % x for x in features])
+        self.fp.flush()
+
+    def close(self):
+        self.fp.close()
+
+class _StoreOutput:
+    # Row of each image fixed by the order of items; created on first result
+    def __init__(self, path, resume, names):
+        from .store import FeatureStore
+        self.path, self.names, self.store = path, names, None
+        self.done = set()
+        if os.path.exists(path):
+            if not resume:
+                raise FileExistsError(path + ' exists; use --resume to continue it')
+            self.store = FeatureStore.open(path, 'r+')
+            if self.store.names != names:
+                raise ValueError('Images do not match the rows of ' + path)
+            self.done = set(names) - set(names[i] for i in self.store.missing())
+        self.row = {name: i for i, name in enumerate(names)}
+
+    def write(self, name, features, labels):
+        from .store import FeatureStore
+        if self.store is None:
+            self.store = FeatureStore.create(self.path, len(self.names), labels,
+                                             names=self.names)
+        elif self.store.labels != list(labels):
+            raise ValueError('Labels of ' + name + ' do not match the labels of ' + self.path)
+        self.store.write(self.row[name], features)
+
+    def close(self):
+        if self.store is not None:
+            self.store.flush()
+
+def _results(items, extractor, workers, profiling=None):
+    if workers == 1:
+        _init_worker(extractor, profiling)
+        for item in items:
+            try:
+                yield _extract(*item)
+            except Exception as e:
+                yield item[0], e, None, None
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(extractor, profiling)) as executor:
+        futures = {executor.submit(_extract, *item): item[0] for item in items}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield futures[future], e, None, None
+
+def extract(items, output, config=None, workers=1, threads=1, crop=False,
+            resume=False, profile=None, profile_memory=False, cache=None,
+            log=sys.stderr):
+    '''
+    Parameters
+    ----------
+    items : list
+        (name, image path, mask path or None) of each image.
+    output : str
+        Output csv file; first column is the name, then one per feature. If
+        it ends with .npy, a FeatureStore with a row per item.
+    config : dict or list, optional
+        Feature families and parameters, as for FeatureExtractor.
+    workers : int, optional
+        Number of worker processes. The default is 1.
+    threads : int, optional
+        Number of threads per image, as for FeatureExtractor. The default is 1.
+    crop : bool, optional
+        Crop to the ROI bounding box before extraction. The default is False.
+    resume : bool, optional
+        Skip images already in output. The default is False.
+    profile : str, optional
+        Csv file for wall time, CPU time and peak allocation of each feature
+        family and stage of each image (columns name, stage, calls, wall,
+        cpu, peak). The default is None (no profiling).
+    profile_memory : bool, optional
+        Trace peak allocation when profiling, which slows down extraction.
+        The default is False.
+    cache : FeatureCache, optional
+        Cache of features, shared by the workers. The default is None.
+
+    Returns
+    -------
+    n_failed : int
+        Number of images that failed; they are not written and are retried
+        on the next resumed run.
+    '''
+    from .extractor import FeatureExtractor
+    extractor = FeatureExtractor(config, crop=crop, threads=threads, cache=cache)
+
+    if output.endswith('.npy'):
+        out = _StoreOutput(output, resume, [item[0] for item in items])
+    else:
+        out = _CsvOutput(output, resume)
+    done = out.done
+    todo = [item for item in items if item[0] not in done]
+    log.write('%d images, %d done, %d to go\n' % (len(items), len(done), len(todo)))
+
+    profiling = None
+    if profile is not None:
+        profiling = 'memory' if profile_memory else 'time'
+        rows = []
+        if os.path.exists(profile) and resume:
+            # Keep the rows of images in output only
+            _completed_rows(profile)
+            with open(profile, newline='') as fp:
+                rows = [row for row in list(csv.reader(fp))[1:] if row and row[0] in done]
+        with open(profile, 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(['name', 'stage', 'calls', 'wall', 'cpu', 'peak'])
+            writer.writerows(rows)
+
+    n_failed = 0
+    with open(os.devnull if profile is None else profile, 'a', newline='') as fp_profile:
+        writer_profile = csv.writer(fp_profile)
+        results = _results(todo, extractor, workers, profiling)
+        try:
+            for i, (name, features, labels, summary) in enumerate(results):
+                if isinstance(features, Exception):
+                    n_failed += 1
+                    log.write('failed %s: %r\n' % (name, features))
+                    continue
+                out.write(name, features, labels)
+                if summary is not None:
+                    for stage, s in summary.items():
+                        writer_profile.writerow([name, stage, s['calls'], '%.6f' % s['wall'],
+                                                 '%.6f' % s['cpu'], '' if s['peak'] is None else s['peak']])
+                    fp_profile.flush()
+                log.write('[%d/%d] %s\n' % (i+1, len(todo), name))
+        finally:
+            out.close()
+    return n_failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='pyfeats', description='PyFeats feature extraction')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('extract', help='extract features of a set of images')
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument('--images', help='directory of images')
+    source.add_argument('--manifest', help='csv file with columns image, mask (optional), name (optional)')
+    p.add_argument('--masks', help='directory of masks or point files, matched to images by file name')
+    p.add_argument('--output', required=True, help='output csv file, or feature store if it ends with .npy')
+    p.add_argument('--config', help='json file {family: {parameter: value}}; default: all families')
+    p.add_argument('--families', help='comma separated families with default parameters')
+    p.add_argument('--workers', type=int, default=1, help='worker processes (default: 1)')
+    p.add_argument('--threads', type=int, default=1, help='threads per image (default: 1)')
+    p.add_argument('--crop', action='store_true', help='crop to the ROI bounding box')
+    p.add_argument('--resume', action='store_true', help='continue an interrupted run')
+    p.add_argument('--profile', help='csv file for time of each feature family and stage')
+    p.add_argument('--profile-memory', action='store_true', help='also trace peak allocation (slower)')
+    p.add_argument('--cache', help='feature cache directory')
+    p.add_argument('--cache-size', type=float, default=1024, help='cache size bound in MB (default: 1024)')
+    p.add_argument('--cache-intermediates', action='store_true',
+                   help='also cache GLRLM/GLSZM matrices and AM-FM reconstructions')
+    args = parser.parse_args(argv)
+
+    if args.images is not None:
+        items = _list_directory(args.images, args.masks)
+    else:
+        items = _list_manifest(args.manifest)
+    config = None
+    if args.config is not None:
+        with open(args.config) as fp:
+            config = json.load(fp)
+    elif args.families is not None:
+        config = [name.strip() for name in args.families.split(',') if name.strip()]
+    cache = None
+    if args.cache is not None:
+        from .cache import FeatureCache
+        cache = FeatureCache(args.cache, max_bytes=int(args.cache_size * 2**20),
+                             intermediates=args.cache_intermediates)
+
+    try:
+        n_failed = extract(items, args.output, config, workers=args.workers,
+                           threads=args.threads, crop=args.crop, resume=args.resume,
+                           profile=args.profile, profile_memory=args.profile_memory,
+                           cache=cache)
+    except (FileExistsError, ValueError) as e:
+        parser.error(str(e))
+    return 1 if n_failed > 0 else 0
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+@author: Nikolaos Giakoumoglou
+@date: Sun Oct 18 10:12:41 2026
+==============================================================================
+Feature extraction engine: compute several feature families of one image in a
+single pass over a shared context of intermediates (cached casts, boolean
+mask, ROI bounding box, quantized image).
+==============================================================================
+"""
+
+import hashlib
+import contextlib
+import contextvars
+import numpy as np
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from .utilities import _image_xor
+from .profiling import stage
+
+__all__ = ['FeatureContext', 'FeatureExtractor', 'DEFAULT_CONFIG']
+
+class FeatureContext:
+    '''
+    Intermediates of one image, shared by all feature families. Each array is
+    computed on first access and kept for the lifetime of the context.
+
+    Parameters
+    ----------
+    f : numpy ndarray
+        Image of dimensions N1 x N2.
+    mask : numpy ndarray
+        Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else. Give None
+        if you want to consider ROI the whole image.
+    perimeter : numpy ndarray, optional
+        Image N1 x N2 with 1 if pixels belongs to perimeter of ROI, 0 else.
+        If None, it is derived from the mask.
+    '''
+
+    def __init__(self, f, mask=None, perimeter=None):
+        self.f = np.asarray(f)
+        if mask is None:
+            mask = np.ones(self.f.shape)
+        self.mask = np.asarray(mask)
+        self._perimeter = perimeter
+        self._quantized = {}
+        # Executor for the independent filters inside one family, if any
+        self.executor = None
+        # FeatureCache of the families, if any
+        self.cache = None
+
+    @cached_property
+    def digest(self):
+        # Hash of image, mask and perimeter (if given), for cache keys
+        h = hashlib.sha256()
+        for a in [self.f, self.mask, self._perimeter]:
+            if a is not None:
+                a = np.ascontiguousarray(a)
+                h.update((a.dtype.str + str(a.shape)).encode())
+                h.update(a.data)
+            h.update(b';')
+        return h.hexdigest()
+
+    @cached_property
+    def f_uint8(self):
+        return self.f.astype(np.uint8, copy=False)
+
+    @cached_property
+    def f_double(self):
+        return self.f.astype(np.double, copy=False)
+
+    @cached_property
+    def mask_bool(self):
+        return self.mask.astype(bool, copy=False)
+
+    @cached_property
+    def mask_uint8(self):
+        return self.mask.astype(np.uint8, copy=False)
+
+    @cached_property
+    def mask_double(self):
+        return self.mask.astype(np.double, copy=False)
+
+    @cached_property
+    def mask_c(self):
+        '''Complementary mask: 1 outside ROI, 0 inside.'''
+        return _image_xor(self.mask_uint8)
+
+    @cached_property
+    def roi(self):
+        '''Gray levels of the pixels inside the ROI.'''
+        return self.f_uint8[self.mask_bool]
+
+    @cached_property
+    def bbox(self):
+        '''ROI bounding box as (row_min, row_max+1, col_min, col_max+1).'''
+        rows = np.flatnonzero(self.mask_bool.any(axis=1))
+        cols = np.flatnonzero(self.mask_bool.any(axis=0))
+        if rows.size == 0:
+            return 0, self.f.shape[0], 0, self.f.shape[1]
+        return rows[0], rows[-1]+1, cols[0], cols[-1]+1
+
+    @cached_property
+    def perimeter(self):
+        '''ROI pixels with at least one 4-neighbour outside the ROI.'''
+        if self._perimeter is not None:
+            return np.asarray(self._perimeter)
+        m = np.pad(self.mask_bool, 1)
+        inner = m[:-2,1:-1] & m[2:,1:-1] & m[1:-1,:-2] & m[1:-1,2:]
+        return (self.mask_bool & ~inner).astype(np.int32)
+
+    def quantized(self, Ng=256):
+        '''
+        Image quantized to Ng gray levels (0...Ng-1), assuming 8-bit input.
+        '''
+        if Ng not in self._quantized:
+            if Ng == 256:
+                q = self.f_uint8
+            else:
+                q = (self.f_uint8.astype(np.int64) * Ng // 256).astype(np.uint8)
+            self._quantized[Ng] = q
+        return self._quantized[Ng]
+
+    def cropped(self, pad=2):
+        '''
+        New context with image, mask and perimeter cropped to the ROI bounding
+        box and zero-padded by pad pixels on every side.
+        '''
+        a, b, c, d = self.bbox
+        crop = lambda x: np.pad(np.asarray(x)[a:b,c:d], pad, mode='constant')
+        f = np.multiply(self.f_double, self.mask_double).astype(self.f.dtype)
+        return FeatureContext(crop(f), crop(self.mask), crop(self.perimeter))
+
+def _labelled(name, n):
+    return [name + '_' + str(i) for i in range(n)]
+
+# Adapters import their family on first use, so that an extractor (or a
+# worker process) only loads the dependencies of the configured families
+def _fos(ctx):
+    from .textural import fos
+    return fos(ctx.f_uint8, ctx.mask_uint8, roi=ctx.roi)
+
+def _glcm(ctx, ignore_zeros=True, sparse=False):
+    from .textural import glcm_features
+    f = ctx.f if sparse else ctx.f_uint8
+    mean, rng, labels_mean, labels_range = glcm_features(f, ignore_zeros, ctx.mask_uint8, sparse=sparse)
+    return np.concatenate([mean, rng]), labels_mean + labels_range
+
+def _glds(ctx, Dx=[0,1,1,1], Dy=[1,1,0,-1]):
+    from .textural import glds_features
+    return glds_features(ctx.f_double, ctx.mask_double, Dx=Dx, Dy=Dy)
+
+def _ngtdm(ctx, d=1):
+    from .textural import ngtdm_features
+    return ngtdm_features(ctx.f_uint8, ctx.mask_uint8, d=d)
+
+def _sfm(ctx, Lr=4, Lc=4):
+    from .textural import sfm_features
+    return sfm_features(ctx.f_double, ctx.mask_double, Lr=Lr, Lc=Lc)
+
+def _lte(ctx, l=7):
+    from .textural import lte_measures
+    return lte_measures(ctx.f_double, ctx.mask_double, l=l, executor=ctx.executor, mask_c=ctx.mask_c)
+
+def _fdta(ctx, s=3):
+    from .textural import fdta
+    return fdta(ctx.f_double, ctx.mask, s=s)
+
+def _glrlm(ctx, Ng=256):
+    from .textural import glrlm_features
+    return glrlm_features(ctx.quantized(Ng), ctx.mask, Ng=Ng)
+
+def _fps(ctx):
+    from .textural import fps
+    return fps(ctx.f_double, ctx.mask_double)
+
+def _shape(ctx, pixels_per_mm2=1):
+    from .textural import shape_parameters
+    return shape_parameters(ctx.f, ctx.mask, ctx.perimeter, pixels_per_mm2=pixels_per_mm2)
+
+def _hos(ctx, th=[135,140]):
+    from .textural import hos_features
+    return hos_features(ctx.f, th=th)
+
+def _lbp(ctx, P=[8,16,24], R=[1,2,3]):
+    from .textural import lbp_features
+    return lbp_features(ctx.f, ctx.mask, P=P, R=R)
+
+def _glszm(ctx, connectivity=1):
+    from .textural import glszm_features
+    return glszm_features(ctx.f_uint8, ctx.mask, connectivity=connectivity)
+
+def _grayscale_morphology(ctx, N=30):
+    from .morphological import grayscale_morphology_features
+    pdf, cdf = grayscale_morphology_features(ctx.f_uint8, N=N)
+    labels = _labelled('GrayscaleMorphology_pdf', N) + _labelled('GrayscaleMorphology_cdf', N)
+    return np.concatenate([pdf, cdf]), labels
+
+def _multilevel_binary_morphology(ctx, N=30, thresholds=[25,50]):
+    from .morphological import multilevel_binary_morphology_features
+    out = multilevel_binary_morphology_features(ctx.f_uint8, ctx.mask_uint8, N=N, thresholds=thresholds)
+    labels = []
+    for name in ['pdf_L', 'pdf_M', 'pdf_H', 'cdf_L', 'cdf_M', 'cdf_H']:
+        labels += _labelled('BinaryMorphology_' + name, N)
+    return np.concatenate(out), labels
+
+def _histogram(ctx, bins=32):
+    from .histogram import histogram
+    return histogram(ctx.f_uint8, ctx.mask_uint8, bins=bins, roi=ctx.roi)
+
+def _multiregion_histogram(ctx, bins=32, num_eros=3, square_size=3):
+    from .histogram import multiregion_histogram
+    return multiregion_histogram(ctx.f_uint8, ctx.mask_uint8, bins=bins, num_eros=num_eros, square_size=square_size)
+
+def _correlogram(ctx, bins_digitize=32, bins_hist=32):
+    from .histogram import correlogram
+    Hd, Ht, labels = correlogram(ctx.f, ctx.mask, bins_digitize=bins_digitize, bins_hist=bins_hist, flatten=True)
+    labels_d = [label.replace('Correlogram_', 'Correlogram_Distance_') for label in labels]
+    labels_t = [label.replace('Correlogram_', 'Correlogram_Angle_') for label in labels]
+    return np.concatenate([Hd, Ht]), labels_d + labels_t
+
+def _dwt(ctx, wavelet='bior3.3', levels=3):
+    from .multiscale import dwt_features
+    return dwt_features(ctx.f, ctx.mask, wavelet=wavelet, levels=levels, executor=ctx.executor)
+
+def _swt(ctx, wavelet='bior3.3', levels=3):
+    from .multiscale import swt_features
+    return swt_features(ctx.f, ctx.mask, wavelet=wavelet, levels=levels)
+
+def _wp(ctx, wavelet='coif1', maxlevel=3):
+    from .multiscale import wp_features
+    return wp_features(ctx.f, ctx.mask, wavelet=wavelet, maxlevel=maxlevel)
+
+def _gt(ctx, deg=4, freq=[0.05, 0.4]):
+    from .multiscale import gt_features
+    return gt_features(ctx.f, ctx.mask, deg=deg, freq=freq, executor=ctx.executor, mask_c=ctx.mask_c)
+
+def _amfm(ctx, bins=32):
+    from .multiscale import amfm_features
+    return amfm_features(ctx.f, bins=bins, executor=ctx.executor)
+
+def _hog(ctx, ppc=8, cpb=3):
+    from .other import hog_features
+    return hog_features(ctx.f, ppc=ppc, cpb=cpb)
+
+def _hu(ctx):
+    from .other import hu_moments
+    return hu_moments(ctx.f)
+
+def _tas(ctx):
+    from .other import tas_features
+    return tas_features(ctx.f)
+
+def _zernikes(ctx, radius=9):
+    from .other import zernikes_moments
+    return zernikes_moments(ctx.f, radius=radius)
+
+# Feature family name -> function(ctx, **params) returning (features, labels)
+_FAMILIES = {
+    'fos': _fos,
+    'glcm_features': _glcm,
+    'glds_features': _glds,
+    'ngtdm_features': _ngtdm,
+    'sfm_features': _sfm,
+    'lte_measures': _lte,
+    'fdta': _fdta,
+    'glrlm_features': _glrlm,
+    'fps': _fps,
+    'shape_parameters': _shape,
+    'hos_features': _hos,
+    'lbp_features': _lbp,
+    'glszm_features': _glszm,
+    'grayscale_morphology_features': _grayscale_morphology,
+    'multilevel_binary_morphology_features': _multilevel_binary_morphology,
+    'histogram': _histogram,
+    'multiregion_histogram': _multiregion_histogram,
+    'correlogram': _correlogram,
+    'dwt_features': _dwt,
+    'swt_features': _swt,
+    'wp_features': _wp,
+    'gt_features': _gt,
+    'amfm_features': _amfm,
+    'hog_features': _hog,
+    'hu_moments': _hu,
+    'tas_features': _tas,
+    'zernikes_moments': _zernikes}
+
+# Same families and parameters as demo/demo.py
+DEFAULT_CONFIG = {
+    'fos': {},
+    'glcm_features': {'ignore_zeros': True},
+    'glds_features': {'Dx': [0,1,1,1], 'Dy': [1,1,0,-1]},
+    'ngtdm_features': {'d': 1},
+    'sfm_features': {'Lr': 4, 'Lc': 4},
+    'lte_measures': {'l': 7},
+    'fdta': {'s': 3},
+    'glrlm_features': {'Ng': 256},
+    'fps': {},
+    'shape_parameters': {'pixels_per_mm2': 1},
+    'hos_features': {'th': [135,140]},
+    'lbp_features': {'P': [8,16,24], 'R': [1,2,3]},
+    'glszm_features': {},
+    'grayscale_morphology_features': {'N': 30},
+    'multilevel_binary_morphology_features': {'N': 30, 'thresholds': [25,50]},
+    'histogram': {'bins': 32},
+    'multiregion_histogram': {'bins': 32, 'num_eros': 3, 'square_size': 3},
+    'correlogram': {'bins_digitize': 32, 'bins_hist': 32},
+    'dwt_features': {'wavelet': 'bior3.3', 'levels': 3},
+    'swt_features': {'wavelet': 'bior3.3', 'levels': 3},
+    'wp_features': {'wavelet': 'coif1', 'maxlevel': 3},
+    'gt_features': {'deg': 4, 'freq': [0.05, 0.4]},
+    'amfm_features': {'bins': 32},
+    'hog_features': {'ppc': 8, 'cpb': 3},
+    'hu_moments': {},
+    'tas_features': {},
+    'zernikes_moments': {'radius': 9}}
+
+def _run(ctx, name, params):
+    with stage(name):
+        if ctx.cache is None:
+            return _FAMILIES[name](ctx, **params)
+        key = ctx.cache.key(name, params, ctx.digest)
+        out = ctx.cache.get_features(key)
+        if out is None:
+            out = _FAMILIES[name](ctx, **params)
+            ctx.cache.put_features(key, *out)
+        return out
+
+class FeatureExtractor:
+    '''
+    Compute several feature families of an image in one pass over a shared
+    FeatureContext.
+
+    Parameters
+    ----------
+    config : dict or list, optional
+        Feature families to compute, as {family: {parameter: value}} or as a
+        list of family names with default parameters. Family names are the
+        names of the pyfeats functions, e.g. 'fos' or 'glcm_features'. The
+        default is DEFAULT_CONFIG.
+    crop : bool, optional
+        Crop image and mask to the ROI bounding box before extraction. The
+        default is False.
+    pad : int, optional
+        Zero padding around the ROI bounding box when crop is True. The
+        default is 2.
+    threads : int, optional
+        Number of threads. With more than 1 thread, the families run
+        concurrently and lte_measures, gt_features, amfm_features and
+        dwt_features also run their independent filters concurrently. The 
+        default is 1.
+    cache : FeatureCache, optional
+        Cache of the features of each family (and of intermediates, if the
+        cache stores them). Only families whose image, mask or parameters
+        changed are computed. The default is None.
+    '''
+
+    def __init__(self, config=None, crop=False, pad=2, threads=1, cache=None):
+        if config is None:
+            config = DEFAULT_CONFIG
+        if not isinstance(config, dict):
+            config = {name: {} for name in config}
+        for name in config:
+            if name not in _FAMILIES:
+                raise ValueError('Unknown feature family: ' + str(name))
+        self.config = {name: dict(params or {}) for name, params in config.items()}
+        self.crop = crop
+        self.pad = pad
+        self.threads = threads
+        self.cache = cache
+
+    def context(self, f, mask=None, perimeter=None):
+        '''
+        Build the shared context of an image, cropped if requested.
+        '''
+        ctx = FeatureContext(f, mask, perimeter)
+        if self.crop:
+            ctx = ctx.cropped(self.pad)
+        return ctx
+
+    def extract_families(self, f, mask=None, perimeter=None):
+        '''
+        Returns
+        -------
+        out : dict
+            Feature family -> (features, labels), in config order.
+        '''
+        ctx = self.context(f, mask, perimeter)
+        ctx.cache = self.cache
+        with self.cache if self.cache is not None else contextlib.nullcontext():
+            results = self._run_families(ctx)
+        out = {}
+        for name, (features, labels) in zip(self.config, results):
+            out[name] = (np.asarray(features, np.double).ravel(), list(labels))
+        return out
+
+    def _run_families(self, ctx):
+        if self.threads > 1:
+            # Filters of a family go to their own pool, so that a family 
+            # waiting on its filters never blocks the pool running families
+            with ThreadPoolExecutor(self.threads) as families, \
+                 ThreadPoolExecutor(self.threads) as filters:
+                ctx.executor = filters
+                # Families run in a copy of this context (e.g. the cache)
+                context = contextvars.copy_context()
+                results = list(families.map(lambda item: context.copy().run(_run, ctx, *item),
+                                            self.config.items()))
+            ctx.executor = None
+        else:
+            results = [_run(ctx, name, params) for name, params in self.config.items()]
+        return results
+
+    def extract(self, f, mask=None, perimeter=None):
+        '''
+        Parameters
+        ----------
+        f : numpy ndarray
+            Image of dimensions N1 x N2.
+        mask : numpy ndarray
+            Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else. Give
+            None if you want to consider ROI the whole image.
+        perimeter : numpy ndarray, optional
+            Image N1 x N2 with 1 if pixels belongs to perimeter of ROI, 0
+            else. Only used by shape_parameters; derived from the mask if
+            None.
+
+        Returns
+        -------
+        features : numpy ndarray
+            Features of all families concatenated in config order.
+        labels : list
+            Labels of features.
+        '''
+        out = self.extract_families(f, mask, perimeter)
+        if len(out) == 0:
+            return np.zeros(0, np.double), []
+        features = np.concatenate([features for features, _ in out.values()])
+        labels = [label for _, labels in out.values() for label in labels]
+        return features, labels
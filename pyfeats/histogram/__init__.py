@@ -1,7 +1,16 @@
-from .histogram import histogram, plot_histogram
+# Functions named as their module must be bound here, before any import of
+# the module can shadow them; the rest are imported on first access.
+from .._lazy import attach
+from .histogram import histogram
 from .multiregion_histogram import multiregion_histogram
-from .correlogram import correlogram, plot_correlogram
+from .correlogram import correlogram
 
-__all__ = ['histogram', 'plot_histogram',
+__all__ = ['histogram', 'histogram_batch', 'plot_histogram',
            'multiregion_histogram',
-           'correlogram', 'plot_correlogram']
\ No newline at end of file
+           'correlogram', 'plot_correlogram']
+
+_modules = {'histogram_batch': '.histogram',
+            'plot_histogram': '.histogram',
+            'plot_correlogram': '.correlogram'}
+
+__getattr__, __dir__ = attach(__name__, _modules)
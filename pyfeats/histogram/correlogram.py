@@ -6,8 +6,6 @@
 ==============================================================================
 """
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.spatial import distance
 
 def correlogram(f, mask, bins_digitize = 32, bins_hist = 32, flatten=False):
     ''' 
@@ -35,6 +33,8 @@ def correlogram(f, mask, bins_digitize = 32, bins_hist = 32, flatten=False):
     labels : list
         Labels of features.
     '''
+
+    from scipy.spatial import distance
     
     if mask is None:
         mask = np.ones(f.shape) 
@@ -53,7 +53,7 @@ def correlogram(f, mask, bins_digitize = 32, bins_hist = 32, flatten=False):
     D[mask == 0] = 0
     D /= D.max() # normalise to [0,1]
     D = np.digitize(D, bins=np.arange(0,1,1/bins_digitize), 
-                    right=False).astype(np.float)
+                    right=False).astype(np.double)
     D[mask == 0] = np.nan
     
     # Step 2.2 Make histogram
@@ -73,7 +73,7 @@ def correlogram(f, mask, bins_digitize = 32, bins_hist = 32, flatten=False):
             
     # angles between -180 and 180 degrees
     T = np.digitize(T, bins=np.arange(-180,180,360/bins_digitize), 
-                    right=False).astype(np.float)
+                    right=False).astype(np.double)
     T[mask == 0] = np.nan
     
     # Step 3.2: Make histogram
@@ -94,6 +94,7 @@ def correlogram(f, mask, bins_digitize = 32, bins_hist = 32, flatten=False):
         return Hd, Ht, labels
 
 def plot_correlogram(f, mask, bins_digitize = 32, bins_hist = 32, name=''):
+    import matplotlib.pyplot as plt
     Hd, Ht, _ = correlogram(f, mask, bins_digitize, bins_hist, False)
     if name != '':
         name = '('+name+')'
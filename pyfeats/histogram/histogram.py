@@ -7,9 +7,8 @@
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
 
-def histogram(f, mask, bins=32): 
+def histogram(f, mask, bins=32, roi=None): 
     ''' 
     Parameters
     ----------
@@ -20,7 +19,9 @@ def histogram(f, mask, bins=32):
         if you want to consider ROI the whole image.
     bins : int, optional
          Bins for histogram. The default is 32.
-
+    roi : numpy ndarray, optional
+        Gray levels of the pixels inside the ROI if already computed, e.g. by
+        FeatureExtractor. The default is None (extracted from f and mask).
 
     Returns
     -------
@@ -33,20 +34,63 @@ def histogram(f, mask, bins=32):
     if mask is None:
         mask = np.ones(f.shape)
         
-    f  = f.astype(np.uint8)
-    mask = mask.astype(np.uint8)
+    f  = f.astype(np.uint8, copy=False)
+    mask = mask.astype(np.uint8, copy=False)
     level_min = 0
     level_max = 255
 
-    f_ravel = f.ravel() 
-    mask_ravel = mask.ravel() 
-    roi = f_ravel[mask_ravel.astype(bool)] 
+    if roi is None:
+        f_ravel = f.ravel() 
+        mask_ravel = mask.ravel() 
+        roi = f_ravel[mask_ravel.astype(bool)] 
     H = np.histogram(roi, bins=bins, range=[level_min, level_max], density=True)[0]
 
     labels = ['Histogram_bin_'+str(b) for b in range(bins)] 
     return H, labels
+
+def histogram_batch(f, mask, bins=32):
+    ''' 
+    Parameters
+    ----------
+    f : numpy ndarray
+        Stack of K images of dimensions K x N1 x N2.
+    mask : numpy ndarray
+        Stack of K masks K x N1 x N2 with 1 if pixels belongs to ROI, 0 else.
+        Give None if you want to consider ROI the whole image.
+    bins : int, optional
+         Bins for histogram. The default is 32.
+
+    Returns
+    -------
+    H : numpy ndarray
+        Histogram of each image of f for 256 gray levels (K x bins).
+    labels : list
+        Labels of features, which are the bins' number.
+    '''
+    
+    if mask is None:
+        mask = np.ones(f.shape)
+        
+    f  = f.astype(np.uint8, copy=False)
+    mask = mask.astype(bool, copy=False)
+    level_min = 0
+    level_max = 255
+    K = f.shape[0]
+    
+    # Bin of each gray level as in np.histogram, then one bincount for all
+    edges = np.linspace(level_min, level_max, bins+1)
+    levels = np.arange(level_max+1)
+    level_bin = np.minimum(np.searchsorted(edges, levels, side='right') - 1, bins-1)
+    offset = (np.arange(K) * bins).reshape(-1,1,1)
+    H = np.bincount((level_bin[f] + offset)[mask], 
+                    minlength=K*bins).reshape(K,bins).astype(np.double)
+    H /= H.sum(axis=1, keepdims=True) * np.diff(edges)
+
+    labels = ['Histogram_bin_'+str(b) for b in range(bins)] 
+    return H, labels
         
 def plot_histogram(f, mask, Ng=256, bins=32, name=''):
+    import matplotlib.pyplot as plt
     if name != '':
         name = '('+name+')'
     f_ravel = f.ravel()
@@ -7,7 +7,6 @@
 """
 
 import numpy as np
-from skimage import morphology
 import itertools
 
 def multiregion_histogram(f, mask, bins=32, num_eros=3, square_size=3):
@@ -34,11 +33,13 @@ def multiregion_histogram(f, mask, bins=32, num_eros=3, square_size=3):
     labels : list
         Labels of features.
     '''
+
+    from skimage import morphology
     
     if mask is None:
         mask = np.ones(f.shape)
-    f2 = f.astype(np.uint8)               
-    mask2 = mask.astype(np.uint8)   
+    f2 = f.astype(np.uint8, copy=False)               
+    mask2 = mask.astype(np.uint8, copy=False)   
     kernel = morphology.square(square_size)
     level_min = 0
     level_max = 255
@@ -1,5 +1,11 @@
-from .grayscale_morphological_analysis import grayscale_morphology_features, plot_pdf_cdf
-from .multilevel_binary_morphological_analysis import multilevel_binary_morphology_features, plot_pdfs_cdfs
+from .._lazy import attach
 
 __all__ = ['grayscale_morphology_features','plot_pdf_cdf',
-           'multilevel_binary_morphology_features','plot_pdfs_cdfs']
\ No newline at end of file
+           'multilevel_binary_morphology_features','plot_pdfs_cdfs']
+
+_modules = {'grayscale_morphology_features': '.grayscale_morphological_analysis',
+            'plot_pdf_cdf': '.grayscale_morphological_analysis',
+            'multilevel_binary_morphology_features': '.multilevel_binary_morphological_analysis',
+            'plot_pdfs_cdfs': '.multilevel_binary_morphological_analysis'}
+
+__getattr__, __dir__ = attach(__name__, _modules)
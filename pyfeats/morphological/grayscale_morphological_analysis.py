@@ -9,8 +9,8 @@
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
 from skimage import morphology
+from ..profiling import stage
 
 def _opening_FP(f, g, n): # (f o ng), n=0,1,2... 
     ''' 
@@ -71,17 +71,19 @@ def grayscale_morphology_features(f, N=30):
     cdf : numpy ndarray
         Cumulative density function (cdf) of pattern spectrum.
     '''
-    f = f.astype(np.uint8)                # grayscale image
+    f = f.astype(np.uint8, copy=False)                # grayscale image
     kernel = np.ones((3,3), np.uint8)     # kerne: cross '+'
     kernel[0,0], kernel[2,2], kernel[0,2], kernel[2,0] = 0, 0, 0, 0 
     ps = np.zeros(N, np.double)           # pattern spectrum
-    for n in range(N):
-        ps[n] = _pattern_spectrum(f,kernel,n)
+    with stage('pattern_spectrum'):
+        for n in range(N):
+            ps[n] = _pattern_spectrum(f,kernel,n)
     pdf = ps / f.sum() 
     cdf = np.cumsum(pdf)  
     return pdf, cdf
 
 def plot_pdf_cdf(pdf, cdf, name=''):
+    import matplotlib.pyplot as plt
     if name != '':
         name = '('+name+')'
     fig, (ax1, ax2) = plt.subplots(1,2)
@@ -8,8 +8,8 @@
 ==============================================================================
 """
 import numpy as np
-import matplotlib.pyplot as plt
 from skimage import morphology
+from ..profiling import stage
 
 def _get_binary_images(img, mask, thresholds=[25,50]): 
     ''' 
@@ -144,19 +144,22 @@ def multilevel_binary_morphology_features(img, mask, N, thresholds=[25,50]):
     '''    
     if mask is None:
         mask = np.ones(img.shape)
-    img = img.astype(np.uint8) # grayscale image
-    mask = mask.astype(np.uint8)
-    L, M, H = _get_binary_images(img, mask, thresholds=thresholds)
+    img = img.astype(np.uint8, copy=False) # grayscale image
+    mask = mask.astype(np.uint8, copy=False)
+    with stage('thresholding'):
+        L, M, H = _get_binary_images(img, mask, thresholds=thresholds)
     kernel = np.ones((3,3), np.uint8) # kernel/structuring element
     kernel[0,0], kernel[2,2], kernel[0,2], kernel[2,0] = 0, 0, 0, 0 # cross '+'
     pdfs, cdfs = np.zeros((N,3),np.double), np.zeros((N,3),np.double)
-    for i, a in enumerate([L, M, H]):
-        pdfs[:,i], cdfs[:,i] = _multilevel_binary_morphological_analysis(a,kernel,N)    
+    with stage('pattern_spectrum'):
+        for i, a in enumerate([L, M, H]):
+            pdfs[:,i], cdfs[:,i] = _multilevel_binary_morphological_analysis(a,kernel,N)    
     pdf_L, pdf_M, pdf_H = np.array_split(pdfs, 3, axis=1)
     cdf_L, cdf_M, cdf_H = np.array_split(cdfs, 3, axis=1)
     return pdf_L.flatten(), pdf_M.flatten(), pdf_H.flatten(), cdf_L.flatten(), cdf_M.flatten(), cdf_H.flatten()
 
 def plot_pdfs_cdfs(pdf_L, pdf_M, pdf_H, cdf_L, cdf_M, cdf_H, name=''):
+    import matplotlib.pyplot as plt
     
     if name != '':
         name = '('+name+')'
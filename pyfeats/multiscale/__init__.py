@@ -1,16 +1,23 @@
-import pywt
-from .dwt import dwt_features
-from .swt import swt_features
-from .wp import wp_features
-from .gt import gt_features
-from .amfm import amfm_features
+from .._lazy import attach
 from .fdta import fdta
 
 __all__ = ['fdta',
-           'dwt_features',
+           'dwt_features', 'dwt_features_batch',
            'swt_features', 
            'wp_features', 
-           'gt_features', 
+           'gt_features', 'gt_features_batch',
            'amfm_features']
 
-__wavelets__ = pywt.wavelist(family=None, kind ='all')
\ No newline at end of file
+_modules = {'dwt_features': '.dwt',
+            'dwt_features_batch': '.dwt',
+            'swt_features': '.swt',
+            'wp_features': '.wp',
+            'gt_features': '.gt',
+            'gt_features_batch': '.gt',
+            'amfm_features': '.amfm'}
+
+def _wavelets():
+    import pywt
+    return pywt.wavelist(family=None, kind ='all')
+
+__getattr__, __dir__ = attach(__name__, _modules, {'__wavelets__': _wavelets})
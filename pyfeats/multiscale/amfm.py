@@ -14,6 +14,9 @@
 import numpy as np
 from  scipy import signal
 import warnings
+from ..utilities import _map
+from ..profiling import stage
+from ..cache import intermediate
 
 def _gabor_kernel_2D(theta, lamda, gamma, bandwidth, phase, overlapIndex):
     qFactor = (1/np.pi) * np.sqrt( (np.log(overlapIndex)/2) ) *  \
@@ -96,10 +99,9 @@ def _calculate_amfm(f):
     IANorm = np.divide(f, IA+1e-16)
     IFx = np.zeros((N1,N2), np.double)
     IFy = np.zeros((N1,N2), np.double)
-    for i in range(1,N1-1):
-        for j in range(1,N2-1):
-            IFx[i,j] = np.abs(np.arccos(np.real((IANorm[i+1,j]+IANorm[i-1,j]) / (2*IANorm[i,j]))))
-            IFy[i,j] = np.abs(np.arccos(np.real((IANorm[i,j+1]+IANorm[i,j-1]) / (2*IANorm[i,j]))))
+    center = 2*IANorm[1:-1,1:-1]
+    IFx[1:-1,1:-1] = np.abs(np.arccos(np.real((IANorm[2:,1:-1]+IANorm[:-2,1:-1]) / center)))
+    IFy[1:-1,1:-1] = np.abs(np.arccos(np.real((IANorm[1:-1,2:]+IANorm[1:-1,:-2]) / center)))
     return IA, IP, IFx, IFy
 
 def _dca(band):
@@ -142,7 +144,7 @@ def _dca(band):
     
     return IA, IP, IFx, IFy
     
-def amfm_features(f, bins=32):
+def amfm_features(f, bins=32, executor=None):
     '''
     Parameters
     ----------
@@ -150,6 +152,9 @@ def amfm_features(f, bins=32):
         Image of dimensions N1 x N2.
     bins: int, optional
         Bins for the calculated histogram. The default is 32.
+    executor : concurrent.futures.Executor, optional
+        Executor to run the 41 filters on, e.g. a ThreadPoolExecutor. The 
+        default is None (sequential).
 
     Returns
     -------
@@ -161,7 +166,6 @@ def amfm_features(f, bins=32):
     
 
     warnings.simplefilter(action='ignore', category=RuntimeWarning)
-    AMFM = []
     filters = _filterbank()
     f_hilbert = signal.hilbert(f)
     
@@ -173,7 +177,7 @@ def amfm_features(f, bins=32):
     #    temp = np.abs(np.sign(temp)-1)
     #    mask_conv.append(temp)
         
-    for i, filtre in enumerate(filters):
+    def _band(filtre):
         f_filtered = signal.convolve2d(f_hilbert, np.rot90(filtre), mode='same', boundary='fill', fillvalue=0)
         #f_filtered = f_filtered * mask_conv[i]
         IA, IP, IFx, IFy = _calculate_amfm(f_filtered)
@@ -181,41 +185,58 @@ def amfm_features(f, bins=32):
         IP = np.nan_to_num(IP)
         IFx = np.nan_to_num(IFx)
         IFy = np.nan_to_num(IFy)
-        AMFM.append([IA, IP, IFx, IFy])
+        return [IA, IP, IFx, IFy]
+    
+    def _reconstruction():
+        # Reconstructed images of the low, medium, high and dc bands
+        with stage('filtering'):
+            AMFM = _map(_band, filters, executor)
      
-    # Access like this: band[i][0] for IA, band[i][1] for IP,
-    # band[i][2] for IFx and band[i][3] for IFy
-    high = []
-    med = []
-    low = []
-    dc = []
-    for i in range(len(filters)):
-        if (i <= 7):
-            high.append(AMFM[i])
-        elif (i<=23):
-            med.append(AMFM[i])
-        elif (i<=39):
-            low.append(AMFM[i])
-        else:
-            dc.append(AMFM[i])
+        # Access like this: band[i][0] for IA, band[i][1] for IP,
+        # band[i][2] for IFx and band[i][3] for IFy
+        high = []
+        med = []
+        low = []
+        dc = []
+        for i in range(len(filters)):
+            if (i <= 7):
+                high.append(AMFM[i])
+            elif (i<=23):
+                med.append(AMFM[i])
+            elif (i<=39):
+                low.append(AMFM[i])
+            else:
+                dc.append(AMFM[i])
+        
+        with stage('dca'):
+            IAl, IPl, IFxl, IFyl = _dca(low)
+        IAl = (IAl > np.percentile(IAl,50)).astype(np.float64) * IAl
+        reconstructionImgDCAl = np.real(IAl * np.cos(IPl))
+        
+        with stage('dca'):
+            IAm, IPm, IFxm, IFym = _dca(med)
+        IAm = (IAm > np.percentile(IAl,50)).astype(np.float64) * IAm
+        reconstructionImgDCAm = np.real(IAm * np.cos(IPm))
+        
+        with stage('dca'):
+            IAh, IPh, IFxh, IFyh = _dca(high)
+        IAh = (IAh > np.percentile(IAl,50)).astype(np.float64) * IAh
+        reconstructionImgDCAh = np.real(IAh * np.cos(IPh))
+        
+        with stage('dca'):
+            IAdc, IPdc, IFxdc, IFydc = _dca(dc)
+        reconstructionImgDCAdc = np.real(IAdc * np.cos(IPdc))
+        
+        return (reconstructionImgDCAl, reconstructionImgDCAm, 
+                reconstructionImgDCAh, reconstructionImgDCAdc)
     
-    IAl, IPl, IFxl, IFyl = _dca(low)
-    IAl = (IAl > np.percentile(IAl,50)).astype(np.float64) * IAl
-    reconstructionImgDCAl = np.real(IAl * np.cos(IPl))
+    # Only the 4 reconstructed images are cached (not the 41 bands), and the
+    # histograms are computed from them
+    reconstructionImgDCAl, reconstructionImgDCAm, reconstructionImgDCAh, \
+        reconstructionImgDCAdc = intermediate('amfm_reconstruction', _reconstruction, f)
     H1 = np.histogram(reconstructionImgDCAl, bins=bins, density=True)[0]
-    
-    IAm, IPm, IFxm, IFym = _dca(med)
-    IAm = (IAm > np.percentile(IAl,50)).astype(np.float64) * IAm
-    reconstructionImgDCAm = np.real(IAm * np.cos(IPm))
     H2 = np.histogram(reconstructionImgDCAm, bins=bins, density=True)[0]
-    
-    IAh, IPh, IFxh, IFyh = _dca(high)
-    IAh = (IAh > np.percentile(IAl,50)).astype(np.float64) * IAh
-    reconstructionImgDCAh = np.real(IAh * np.cos(IPh))
     H3 = np.histogram(reconstructionImgDCAh, bins=bins, density=True)[0]
-    
-    IAdc, IPdc, IFxdc, IFydc = _dca(dc)
-    reconstructionImgDCAdc = np.real(IAdc * np.cos(IPdc))
     H4 = np.histogram(reconstructionImgDCAdc, bins=bins, density=True)[0]
     
     features = np.concatenate([H1, H2, H3, H4])
@@ -11,9 +11,9 @@
 
 import pywt
 import numpy as np
-from ..utilities import _pad_image_power_2
+from ..utilities import _pad_image_power_2, _map
 
-def dwt_features(f, mask, wavelet='bior3.3', levels=3):
+def dwt_features(f, mask, wavelet='bior3.3', levels=3, executor=None):
     ''' 
     Parameters
     ----------
@@ -26,6 +26,9 @@ def dwt_features(f, mask, wavelet='bior3.3', levels=3):
          Filter to be used. Check pywt for filter families. The default is 'bior3.3'
     levels : int, optional
         Levels of decomposition. Default is 3.
+    executor : concurrent.futures.Executor, optional
+        Executor to decompose image and mask on concurrently, e.g. a 
+        ThreadPoolExecutor. The default is None (sequential).
 
     Returns
     -------
@@ -42,13 +45,10 @@ def dwt_features(f, mask, wavelet='bior3.3', levels=3):
     f = _pad_image_power_2(f)       # pad to the next power of 2 in each dimension
     mask = _pad_image_power_2(mask) # pad to the next power of 2 in each dimension
         
-    # Step 2: Get DWT Decomposition for 3 levels
-    coeffs = pywt.wavedec2(f, wavelet=wavelet, level=levels)
-    coeff_arr, coeff_slices = pywt.coeffs_to_array(coeffs)
-    
-    # Step 3: Get DWT Decomposition for 3 levels for mask
-    coeffs_mask = pywt.wavedec2(mask, wavelet=wavelet, level=levels)
-    coeff_arr_mask, coeff_slices_mask = pywt.coeffs_to_array(coeffs_mask)
+    # Step 2-3: Get DWT Decomposition for 3 levels for image and mask
+    decompose = lambda x: pywt.coeffs_to_array(pywt.wavedec2(x, wavelet=wavelet, level=levels))
+    [(coeff_arr, coeff_slices), 
+     (coeff_arr_mask, coeff_slices_mask)] = _map(decompose, [f, mask], executor)
     coeff_arr_mask[coeff_arr_mask!=0] = 1
             
     # Step 4: For each coeff array (10-1=9 sub-images), get mean and std
@@ -68,4 +68,64 @@ def dwt_features(f, mask, wavelet='bior3.3', levels=3):
                           '_' + str(name) + '_std')
             
     # Step 5: Return
-    return features.flatten(), labels
\ No newline at end of file
+    return features.flatten(), labels
+
+def dwt_features_batch(f, mask, wavelet='bior3.3', levels=3):
+    ''' 
+    Parameters
+    ----------
+    f : numpy ndarray
+        Stack of K images of dimensions K x N1 x N2.
+    mask : numpy ndarray
+        Stack of K masks K x N1 x N2 with 1 if pixels belongs to ROI, 0 else.
+        Give None if you want to consider ROI the whole image.
+    wavelet : str, optional
+         Filter to be used. Check pywt for filter families. The default is 'bior3.3'
+    levels : int, optional
+        Levels of decomposition. Default is 3.
+
+    Returns
+    -------
+    features : numpy ndarray
+        Features of dwt_features for each image (K x 6*levels).
+    labels : list
+        Labels of features.
+    '''
+    
+    if mask is None:
+        mask = np.ones(f.shape)
+    K = f.shape[0]
+        
+    # Step 1: Pad Images
+    f = _pad_image_power_2(f)       # pad to the next power of 2 in each dimension
+    mask = _pad_image_power_2(mask) # pad to the next power of 2 in each dimension
+        
+    # Step 2: Get DWT Decomposition of all images at once
+    coeffs = pywt.wavedec2(f, wavelet=wavelet, level=levels, axes=(-2,-1))
+    coeff_arr, coeff_slices = pywt.coeffs_to_array(coeffs, axes=(-2,-1))
+    
+    # Step 3: Get DWT Decomposition of all masks at once
+    coeffs_mask = pywt.wavedec2(mask, wavelet=wavelet, level=levels, axes=(-2,-1))
+    coeff_arr_mask, coeff_slices_mask = pywt.coeffs_to_array(coeffs_mask, axes=(-2,-1))
+    coeff_arr_mask = coeff_arr_mask != 0
+            
+    # Step 4: For each coeff array, get mean and std inside mask of each image
+    labels = []
+    features = np.zeros((K,3*levels,2),np.double)
+    i = 0
+    for level in range(1,levels+1):
+        for name in ['da','dd','ad']:
+            D_f = abs(coeff_arr[coeff_slices[level][name]])
+            D_mask = coeff_arr_mask[coeff_slices[level][name]]
+            n = D_mask.sum(axis=(1,2))
+            mean = np.where(D_mask, D_f, 0).sum(axis=(1,2)) / n
+            var = np.where(D_mask, (D_f - mean.reshape(-1,1,1))**2, 0).sum(axis=(1,2)) / n
+            features[:,i,0], features[:,i,1] = mean, np.sqrt(var)
+            i += 1
+            labels.append('DWT_' + str(wavelet) + '_level_' + str(level) + 
+                          '_' + str(name) + '_mean')
+            labels.append('DWT_' + str(wavelet) + '_level_' + str(level) + 
+                          '_' + str(name) + '_std')
+            
+    # Step 5: Return
+    return features.reshape(K,-1), labels
@@ -10,9 +10,10 @@
 import numpy as np
 from skimage.filters import gabor_kernel
 from scipy import signal
-from ..utilities import _image_xor
+from ..utilities import _image_xor, _map
+from ..profiling import stage
 
-def gt_features(f, mask, deg=4, freq=[0.05, 0.4]):
+def gt_features(f, mask, deg=4, freq=[0.05, 0.4], executor=None, mask_c=None):
     ''' 
     Parameters
     ----------
@@ -25,6 +26,12 @@ def gt_features(f, mask, deg=4, freq=[0.05, 0.4]):
         Quantized degrees. The default is 4 (0, 45, 90, 135 degrees)
     freq: list, optional
         frequency of the gabor kernel. The default is [0.05, 0.4]
+    executor : concurrent.futures.Executor, optional
+        Executor to run the Gabor filters on, e.g. a ThreadPoolExecutor. The
+        default is None (sequential).
+    mask_c : numpy ndarray, optional
+        Complementary mask (1 outside ROI, 0 inside) if already computed, 
+        e.g. by FeatureExtractor. The default is None (computed from mask).
 
     Returns
     -------
@@ -52,30 +59,97 @@ def gt_features(f, mask, deg=4, freq=[0.05, 0.4]):
                           str(frequency) + '_std')
             
     # Step 2: Get mask where convolution should be performed
-    mask_c = _image_xor(mask)
-    mask_convs = []
-    for k in range(len(kernels)):
-        oneskernel = np.ones(kernels[k].shape)
+    if mask_c is None:
+        mask_c = _image_xor(mask)
+    def _mask_conv(kernel):
+        oneskernel = np.ones(kernel.shape)
         temp = signal.convolve2d(mask_c, oneskernel,'same')
-        temp = np.abs(np.sign(temp)-1)
-        mask_convs.append(temp)
+        return np.abs(np.sign(temp)-1)
     
     # Step 3: Convolve image with each kernel and get mean and std
-    features = np.zeros((len(kernels), 2), np.double)
-    for k in range(len(kernels)):
-            D = signal.convolve2d(f, kernels[k], 'same')
-            D = np.multiply(D, mask_convs[k])
-            D_ravel = D.ravel()
-            mask_conv_ravel = mask_convs[k].ravel()
-            roi = D_ravel[mask_conv_ravel==1]
-            if roi.size == 0:
-                features[k, 0], features[k, 1] = 0, 0
-            else:
-                features[k, 0], features[k, 1] = roi.mean(), roi.std()
+    def _mean_std(kernel):
+        D = signal.convolve2d(f, kernel, 'same')
+        mask_conv = _mask_conv(kernel)
+        D = np.multiply(D, mask_conv)
+        D_ravel = D.ravel()
+        mask_conv_ravel = mask_conv.ravel()
+        roi = D_ravel[mask_conv_ravel==1]
+        if roi.size == 0:
+            return 0, 0
+        else:
+            return roi.mean(), roi.std()
+    with stage('filtering'):
+        features = np.array(_map(_mean_std, kernels, executor), np.double)
                 
     # step 4: Return
     return features.flatten(), labels
 
+def gt_features_batch(f, mask, deg=4, freq=[0.05, 0.4]):
+    ''' 
+    Parameters
+    ----------
+    f : numpy ndarray
+        Stack of K images of dimensions K x N1 x N2.
+    mask : numpy ndarray
+        Stack of K masks K x N1 x N2 with 1 if pixels belongs to ROI, 0 else.
+        Give None if you want to consider ROI the whole image.
+    deg: int, optinal
+        Quantized degrees. The default is 4 (0, 45, 90, 135 degrees)
+    freq: list, optional
+        frequency of the gabor kernel. The default is [0.05, 0.4]
+
+    Returns
+    -------
+    features : numpy ndarray
+        Features of gt_features for each image (K x 4*deg*len(freq)).
+    labels : list
+        Labels of features.
+    '''    
+    
+    if mask is None:
+        mask = np.ones(f.shape)
+    f = np.asarray(f, np.double)
+    K, N1, N2 = f.shape
+        
+    # Step 1: Initialize kernels
+    kernels = []
+    labels = []
+    for theta in range(deg): # e.g. th = 0, 45, 90, 135 degrees
+        theta = theta / deg * np.pi
+        for frequency in freq: # e.g. f = 0.05 and 0.4
+            kernel = np.real(gabor_kernel(frequency, theta=theta))
+            kernels.append(kernel)
+            labels.append('GT_th_' + str(theta*4/np.pi) + '_freq_' + 
+                          str(frequency) + '_mean')
+            labels.append('GT_th_' + str(theta*4/np.pi) + '_freq_' + 
+                          str(frequency) + '_std')
+            
+    # Step 2: Get mask where convolution should be performed, i.e. where the
+    # 'same' convolution of the complementary mask with a kernel of ones is 
+    # zero. Box sums come from the integral image of the complementary mask.
+    mask_c = _image_xor(mask).astype(np.int64)
+    mask_convs = []
+    for k in range(len(kernels)):
+        kh, kw = kernels[k].shape
+        pad = ((0,0), (kh-1-(kh-1)//2, (kh-1)//2), (kw-1-(kw-1)//2, (kw-1)//2))
+        C = np.pad(mask_c, pad).cumsum(axis=1).cumsum(axis=2)
+        C = np.pad(C, ((0,0),(1,0),(1,0)))
+        box = C[:,kh:,kw:] - C[:,:-kh,kw:] - C[:,kh:,:-kw] + C[:,:-kh,:-kw]
+        mask_convs.append(box == 0)
+    
+    # Step 3: Convolve images with each kernel and get mean and std in ROI
+    features = np.zeros((K, len(kernels), 2), np.double)
+    for k in range(len(kernels)):
+            D = signal.fftconvolve(f, kernels[k][np.newaxis], mode='same', axes=(1,2))
+            m = mask_convs[k]
+            n = m.sum(axis=(1,2))
+            mean = np.where(m, D, 0).sum(axis=(1,2)) / np.maximum(n, 1)
+            var = np.where(m, (D - mean.reshape(-1,1,1))**2, 0).sum(axis=(1,2)) / np.maximum(n, 1)
+            features[:, k, 0], features[:, k, 1] = mean, np.sqrt(var)
+                
+    # step 4: Return
+    return features.reshape(K, -1), labels
+
 
     
     
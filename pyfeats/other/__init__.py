@@ -1,9 +1,16 @@
-from .hog import hog_features, plot_hog
-from .hu import hu_moments
-from .tas import tas_features
-from .zernikes import zernikes_moments
+from .._lazy import attach
 
 __all__ = ['hog_features', 'plot_hog',
-           'hu_moments',
+           'hu_moments', 'hu_moments_batch',
            'tas_features',
-           'zernikes_moments']
\ No newline at end of file
+           'zernikes_moments', 'zernikes_moments_batch']
+
+_modules = {'hog_features': '.hog',
+            'plot_hog': '.hog',
+            'hu_moments': '.hu',
+            'hu_moments_batch': '.hu',
+            'tas_features': '.tas',
+            'zernikes_moments': '.zernikes',
+            'zernikes_moments_batch': '.zernikes'}
+
+__getattr__, __dir__ = attach(__name__, _modules)
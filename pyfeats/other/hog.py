@@ -7,7 +7,6 @@
 """
 
 from skimage import feature
-import matplotlib.pyplot as plt
 
 def hog_features(f, ppc=8, cpb=3):
     '''
@@ -34,6 +33,7 @@ def hog_features(f, ppc=8, cpb=3):
     return fd, labels
 
 def plot_hog(f, ppc=16, cpb=3, name=''):
+    import matplotlib.pyplot as plt
     _, hog_image = feature.hog(f, orientations=9, pixels_per_cell=(ppc,ppc), 
                     cells_per_block=(cpb,cpb), block_norm='L2', visualize=True)
     if name != '':
@@ -8,6 +8,8 @@
 """
 
 import cv2
+import numpy as np
+from math import comb
 
 def hu_moments(f):
     '''
@@ -26,4 +28,60 @@ def hu_moments(f):
     
     features = cv2.HuMoments(cv2.moments(f)).flatten()
     labels = ['Hu_Moment_' + str(i) for i in range(features.shape[0])]
-    return features, labels
\ No newline at end of file
+    return features, labels
+
+def hu_moments_batch(f):
+    '''
+    Parameters
+    ----------
+    f : numpy ndarray
+        Stack of K images of dimensions K x N1 x N2.
+
+    Returns
+    -------
+    features : numpy ndarray
+        Hu's moments of each image (K x 7).
+    labels : list
+        Labels of features.
+    '''
+    
+    f = np.asarray(f)
+    K, N1, N2 = f.shape
+    
+    # Raw moments m[k,q,p] = sum f x^p y^q of all images from separable 
+    # coordinate powers (centered on the image for accuracy), in chunks of 
+    # ~64K pixels so that the double copy stays in cache
+    Y = (np.arange(N1) - (N1-1)/2).reshape(-1,1) ** np.arange(4)
+    X = (np.arange(N2) - (N2-1)/2).reshape(-1,1) ** np.arange(4)
+    m = np.empty((K,4,4), np.double)
+    step = max(1, 2**16 // (N1*N2))
+    for start in range(0, K, step):
+        m[start:start+step] = Y.T @ (np.asarray(f[start:start+step], np.double) @ X)
+    m00 = m[:,0,0]
+    valid = m00 != 0
+    m00_ = np.where(valid, m00, 1)
+    xc = m[:,0,1] / m00_
+    yc = m[:,1,0] / m00_
+    def nu(p, q):
+        # Central moment by binomial expansion of (x-xc)^p (y-yc)^q
+        mu = np.zeros(K, np.double)
+        for a in range(p+1):
+            for b in range(q+1):
+                mu += comb(p,a) * comb(q,b) * (-xc)**(p-a) * (-yc)**(q-b) * m[:,b,a]
+        return np.where(valid, mu / m00_**(1+(p+q)/2), 0)
+    n20, n11, n02 = nu(2,0), nu(1,1), nu(0,2)
+    n30, n21, n12, n03 = nu(3,0), nu(2,1), nu(1,2), nu(0,3)
+    
+    # Hu's invariants
+    t0, t1 = n30 + n12, n21 + n03
+    q0, q1 = n30 - 3*n12, 3*n21 - n03
+    features = np.zeros((K,7), np.double)
+    features[:,0] = n20 + n02
+    features[:,1] = (n20 - n02)**2 + 4*n11**2
+    features[:,2] = q0**2 + q1**2
+    features[:,3] = t0**2 + t1**2
+    features[:,4] = q0*t0*(t0**2 - 3*t1**2) + q1*t1*(3*t0**2 - t1**2)
+    features[:,5] = (n20 - n02)*(t0**2 - t1**2) + 4*n11*t0*t1
+    features[:,6] = q1*t0*(t0**2 - 3*t1**2) - q0*t1*(3*t0**2 - t1**2)
+    labels = ['Hu_Moment_' + str(i) for i in range(features.shape[1])]
+    return features, labels
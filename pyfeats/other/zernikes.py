@@ -8,6 +8,8 @@
 """
 
 import mahotas
+import numpy as np
+from math import factorial
 
 def zernikes_moments(f, radius=9):
     '''
@@ -28,4 +30,73 @@ def zernikes_moments(f, radius=9):
     
     features = mahotas.features.zernike_moments(f, radius)
     labels = ['Zernikes_Moments_radius_' + str(radius) + '_' + str(i) for i in range(features.shape[0])]
-    return features, labels
\ No newline at end of file
+    return features, labels
+
+def zernikes_moments_batch(f, radius=9):
+    '''
+    Parameters
+    ----------
+    f : numpy ndarray
+        Stack of K images of dimensions K x N1 x N2.
+    radius : int, optional
+        Radius to calculate Zernikes moments. The default is 9.
+
+    Returns
+    -------
+    features : numpy ndarray
+        Zernikes' moments of each image (K x 25), computed as in mahotas on 
+        the circle of given radius around the center of mass of each image.
+    labels : list
+        Labels of features.
+    '''
+    
+    degree = 8
+    f = np.asarray(f, np.double)
+    K, N1, N2 = f.shape
+    
+    # Center of mass of each image from its row and column sums (empty 
+    # images give zero moments, as in mahotas)
+    total = np.maximum(f.sum(axis=(1,2)), np.finfo(np.double).tiny)
+    cy = f.sum(axis=2) @ np.arange(N1) / total
+    cx = f.sum(axis=1) @ np.arange(N2) / total
+    
+    # Only pixels of a window around the center of mass can fall in the disk
+    S1 = min(2 * int(np.ceil(radius)) + 2, N1)
+    S2 = min(2 * int(np.ceil(radius)) + 2, N2)
+    y0 = np.clip(np.floor(cy - radius), 0, N1 - S1).astype(np.intp)
+    x0 = np.clip(np.floor(cx - radius), 0, N2 - S2).astype(np.intp)
+    Y = y0.reshape(-1,1) + np.arange(S1)
+    X = x0.reshape(-1,1) + np.arange(S2)
+    P = f[np.arange(K).reshape(-1,1,1), Y[:,:,np.newaxis], X[:,np.newaxis,:]].reshape(K,-1)
+    
+    # Coordinates relative to the center of mass, scaled to the unit disk
+    Yn = ((Y - cy.reshape(-1,1)) / radius)[:,:,np.newaxis].repeat(S2, 2).reshape(K,-1)
+    Xn = ((X - cx.reshape(-1,1)) / radius)[:,np.newaxis,:].repeat(S1, 1).reshape(K,-1)
+    Dn = np.maximum(np.sqrt(Xn**2 + Yn**2), 1e-9)
+    
+    # Weights of pixels inside the disk, normalized per image
+    W = np.where((Dn <= 1) & (P > 0), P, 0)
+    W /= np.maximum(W.sum(axis=1, keepdims=True), np.finfo(np.double).tiny)
+    An = (Xn + 1j*Yn) / Dn
+    
+    # Zernike moments through degree for all images, from the powers of the 
+    # radial and angular parts computed once
+    Dns = [np.ones_like(Dn)]
+    Ans = [W.astype(np.complex128)]
+    for e in range(degree):
+        Dns.append(Dns[-1] * Dn)
+        Ans.append(Ans[-1] * An)
+    features = []
+    for n in range(degree+1):
+        for l in range(n+1):
+            if (n-l)%2 == 0:
+                R = np.zeros(Dn.shape, np.double)
+                for m in range((n-l)//2+1):
+                    c = (-1)**m * factorial(n-m) / (factorial(m) * 
+                         factorial((n-2*m+l)//2) * factorial((n-2*m-l)//2))
+                    R += c * Dns[n-2*m]
+                z = (n+1) / np.pi * (R * Ans[l]).sum(axis=1)
+                features.append(abs(z))
+    features = np.array(features).T
+    labels = ['Zernikes_Moments_radius_' + str(radius) + '_' + str(i) for i in range(features.shape[1])]
+    return features, labels
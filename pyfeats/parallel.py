@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+@author: Nikolaos Giakoumoglou
+@date: Sun Oct 18 14:37:05 2026
+==============================================================================
+Dataset runner: extract features of many images over a process pool. Images
+and masks are copied once into a shared memory block that every worker maps,
+instead of being pickled to the workers. Optionally, workers write features
+in place into a memory-mapped FeatureStore.
+==============================================================================
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from .extractor import FeatureExtractor
+from .store import FeatureStore
+
+__all__ = ['run_dataset']
+
+_ALIGN = 64
+
+# Per-worker state, set by _init_worker
+_worker = {}
+
+def _pack(arrays):
+    '''
+    Parameters
+    ----------
+    arrays : list
+        Arrays (or None) to be placed in one shared memory block.
+
+    Returns
+    -------
+    shm : SharedMemory
+        Shared memory block holding all arrays.
+    layout : list
+        (offset, shape, dtype) of each array, or None.
+    '''
+    layout = []
+    size = 0
+    for a in arrays:
+        if a is None:
+            layout.append(None)
+            continue
+        layout.append((size, a.shape, a.dtype.str))
+        size += -(-a.nbytes // _ALIGN) * _ALIGN
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for a, item in zip(arrays, layout):
+        if item is not None:
+            offset, shape, dtype = item
+            np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)[...] = a
+    return shm, layout
+
+def _view(shm, item):
+    if item is None:
+        return None
+    offset, shape, dtype = item
+    return np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+
+def _init_worker(name, image_layout, mask_layout, extractor, store=None):
+    shm = shared_memory.SharedMemory(name=name)
+    _worker['shm'] = shm
+    _worker['images'] = image_layout
+    _worker['masks'] = mask_layout
+    _worker['extractor'] = extractor
+    _worker['store'] = None if store is None else FeatureStore.open(store, 'r+')
+
+def _extract(i):
+    shm = _worker['shm']
+    f = _view(shm, _worker['images'][i])
+    mask = _view(shm, _worker['masks'][i])
+    features, labels = _worker['extractor'].extract(f, mask)
+    if _worker['store'] is not None:
+        _worker['store'].write(i, features)
+        return None
+    # Labels are the same for every image: send them once per worker
+    if _worker.get('labels_sent', False):
+        labels = None
+    _worker['labels_sent'] = True
+    return features, labels
+
+def run_dataset(images, masks=None, config=None, workers=None, chunksize=1,
+                store=None, dtype=np.float32, names=None):
+    '''
+    Parameters
+    ----------
+    images : list
+        Images, each a numpy ndarray N1 x N2. Images may differ in size.
+    masks : list, optional
+        Mask of each image with 1 if pixels belongs to ROI, 0 else. Give None
+        (or None for an image) if you want to consider ROI the whole image.
+    config : dict, list or FeatureExtractor, optional
+        Feature families and parameters, as for FeatureExtractor. The default
+        is all families with the parameters of the demo.
+    workers : int, optional
+        Number of worker processes. The default is the number of CPUs. With 1
+        worker, features are extracted in the calling process.
+    chunksize : int, optional
+        Number of images sent to a worker at once. The default is 1.
+    store : str, optional
+        Path of a FeatureStore (.npy) to create; workers write the features
+        of each image in place into its rows. The default is None (features
+        are returned in memory).
+    dtype : numpy dtype, optional
+        Dtype of the store. The default is np.float32.
+    names : list, optional
+        Name of each image, kept in the store. The default is None.
+
+    Returns
+    -------
+    features : numpy ndarray
+        Features of each image (N x n_features), in input order. With store,
+        the FeatureStore opened for reading instead.
+    labels : list
+        Labels of features.
+    '''
+
+    images = [np.ascontiguousarray(f) for f in images]
+    if masks is None:
+        masks = [None] * len(images)
+    masks = [None if m is None else np.ascontiguousarray(m, np.uint8) for m in masks]
+    if len(masks) != len(images):
+        raise ValueError('Number of masks must match number of images')
+    if isinstance(config, FeatureExtractor):
+        extractor = config
+    else:
+        extractor = FeatureExtractor(config)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if store is not None:
+        return _run_store(images, masks, extractor, workers, chunksize, store, dtype, names)
+
+    if workers == 1 or len(images) <= 1:
+        results = map(extractor.extract, images, masks)
+        return _collect(results, len(images))
+
+    # Images and masks share one block; workers only receive its layout
+    shm, layout = _pack(images + masks)
+    image_layout, mask_layout = layout[:len(images)], layout[len(images):]
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name, image_layout, mask_layout,
+                                           extractor)) as executor:
+            results = executor.map(_extract, range(len(images)), chunksize=chunksize)
+            return _collect(results, len(images))
+    finally:
+        shm.close()
+        shm.unlink()
+
+def _run_store(images, masks, extractor, workers, chunksize, path, dtype, names):
+    if len(images) == 0:
+        raise ValueError('No images to store')
+    # The first image fixes the label schema of the store
+    features, labels = extractor.extract(images[0], masks[0])
+    store = FeatureStore.create(path, len(images), labels, names=names, dtype=dtype)
+    store.write(0, features)
+    if workers == 1 or len(images) <= 1:
+        for i in range(1, len(images)):
+            store.write(i, extractor.extract(images[i], masks[i])[0])
+    else:
+        store.flush()
+        shm, layout = _pack(images + masks)
+        image_layout, mask_layout = layout[:len(images)], layout[len(images):]
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shm.name, image_layout, mask_layout,
+                                               extractor, store.path)) as executor:
+                list(executor.map(_extract, range(1, len(images)), chunksize=chunksize))
+        finally:
+            shm.close()
+            shm.unlink()
+    store.flush()
+    del store
+    return FeatureStore.open(path), labels
+
+def _collect(results, n):
+    features, labels = None, None
+    for i, (feats, labs) in enumerate(results):
+        if features is None:
+            features = np.zeros((n, feats.shape[0]), np.double)
+        if labels is None:
+            labels = labs
+        elif feats.shape[0] != features.shape[1]:
+            raise ValueError('Image ' + str(i) + ' has ' + str(feats.shape[0]) +
+                             ' features instead of ' + str(features.shape[1]))
+        features[i] = feats
+    if features is None:
+        return np.zeros((0, 0), np.double), []
+    return features, labels
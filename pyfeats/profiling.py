@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+@author: Nikolaos Giakoumoglou
+@date: Sun Oct 18 20:14:52 2026
+==============================================================================
+Profiling hooks: wall time, CPU time and peak allocation of each feature
+family and of its major stages (e.g. texture matrix vs feature formulas).
+
+    with pyfeats.profile(memory=True) as prof:
+        features, labels = extractor.extract(f, mask)
+    timings, timing_labels = prof.features()
+
+Stages are marked in the code with `with stage(name):`, which costs nothing
+when no profile is active. Nested stages are named parent/child.
+==============================================================================
+"""
+
+import time
+import threading
+import contextvars
+import tracemalloc
+import numpy as np
+
+__all__ = ['profile', 'stage', 'Profile']
+
+# Active profile and innermost open stage, per thread and per task of an 
+# executor (see utilities._map)
+_active = contextvars.ContextVar('pyfeats_profile', default=None)
+_parent = contextvars.ContextVar('pyfeats_stage', default=None)
+
+# Memory tracing is shared by the profiles running at the same time, and only 
+# stopped by the last one if a profile started it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+class Profile:
+    '''
+    Records of a profiling session. Each record is a dict with keys stage,
+    wall (s), cpu (s, of the thread running the stage; work it hands to an
+    executor is not included) and peak (bytes allocated above the level at
+    the start of the stage, or None when memory is not traced). Peaks are
+    exact when stages do not run concurrently, e.g. with threads=1.
+    '''
+
+    def __init__(self, memory=False, callback=None):
+        self.memory = memory
+        self.callback = callback
+        self.records = []
+
+    def _add(self, record):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def summary(self):
+        '''
+        Returns
+        -------
+        summary : dict
+            For each stage (in order of first completion): calls, and total
+            wall, cpu and maximum peak.
+        '''
+        out = {}
+        for r in self.records:
+            s = out.setdefault(r['stage'], {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak': None})
+            s['calls'] += 1
+            s['wall'] += r['wall']
+            s['cpu'] += r['cpu']
+            if r['peak'] is not None:
+                s['peak'] = max(s['peak'] or 0, r['peak'])
+        return out
+
+    def features(self):
+        '''
+        Returns
+        -------
+        features : numpy ndarray
+            Total wall time, CPU time (and peak allocation if traced) of each
+            stage, to be stored alongside the features of an image.
+        labels : list
+            Labels of features.
+        '''
+        features, labels = [], []
+        for name, s in self.summary().items():
+            name = 'Profile_' + name.replace('/', '_')
+            features += [s['wall'], s['cpu']]
+            labels += [name + '_Wall', name + '_CPU']
+            if self.memory:
+                features.append(s['peak'] or 0)
+                labels.append(name + '_Peak')
+        return np.array(features, np.double), labels
+
+class profile:
+    '''
+    Context manager collecting the stages run inside it into a Profile.
+
+    Parameters
+    ----------
+    memory : bool, optional
+        Trace peak allocation of each stage with tracemalloc, which slows down
+        execution. The default is False.
+    callback : callable, optional
+        Called with each record as soon as its stage ends.
+    '''
+
+    def __init__(self, memory=False, callback=None):
+        self.profile = Profile(memory, callback)
+
+    def __enter__(self):
+        global _tracing_users, _tracing_started
+        if self.profile.memory:
+            with _tracing_lock:
+                if _tracing_users == 0:
+                    _tracing_started = not tracemalloc.is_tracing()
+                    if _tracing_started:
+                        tracemalloc.start()
+                _tracing_users += 1
+        self._token = _active.set(self.profile)
+        return self.profile
+
+    def __exit__(self, *exc):
+        global _tracing_users
+        _active.reset(self._token)
+        if self.profile.memory:
+            with _tracing_lock:
+                _tracing_users -= 1
+                if _tracing_users == 0 and _tracing_started:
+                    tracemalloc.stop()
+        return False
+
+class _Stage:
+
+    def __init__(self, name, profile):
+        self.name = name
+        self.profile = profile
+
+    def __enter__(self):
+        self.parent = _parent.get()
+        if self.parent is not None:
+            self.name = self.parent.name + '/' + self.name
+        self._token = _parent.set(self)
+        if self.profile.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Peak is global: keep the one so far for the parent, then reset
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, peak)
+            self.start = current
+            self.peak = current
+            tracemalloc.reset_peak()
+        self.cpu = time.thread_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        peak = None
+        if self.profile.memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            peak = self.peak - self.start
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, self.peak)
+        _parent.reset(self._token)
+        self.profile._add({'stage': self.name, 'wall': wall, 'cpu': cpu, 'peak': peak})
+        return False
+
+class _NoStage:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_STAGE = _NoStage()
+
+def stage(name):
+    '''
+    Context manager marking a stage of computation: recorded by the active
+    profile, if any.
+    '''
+    active = _active.get()
+    if active is None:
+        return _NO_STAGE
+    return _Stage(name, active)
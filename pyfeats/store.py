@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+@author: Nikolaos Giakoumoglou
+@date: Sun Oct 18 22:02:19 2026
+==============================================================================
+Feature store: a preallocated, memory-mapped N x n_features matrix (.npy)
+with a fixed label schema and row names kept once in a json sidecar, and a
+flag per row marking it as written. Workers fill rows in place; readers map
+slices without loading the whole file.
+
+    features.npy         N x n_features, float32 or float64
+    features.filled.npy  N flags, 1 if the row is written
+    features.json        labels, row names, dtype
+==============================================================================
+"""
+
+import os
+import json
+import numpy as np
+
+__all__ = ['FeatureStore']
+
+def _paths(path):
+    base = path[:-4] if path.endswith('.npy') else path
+    return base + '.npy', base + '.filled.npy', base + '.json'
+
+class FeatureStore:
+    '''
+    Use FeatureStore.create to make a new store and FeatureStore.open to open
+    an existing one.
+
+    Attributes
+    ----------
+    features : numpy memmap
+        Features of each row (N x n_features).
+    filled : numpy memmap
+        1 if the row is written, 0 else (N).
+    labels : list
+        Labels of features.
+    names : list
+        Name of each row (e.g. image file), or None.
+    '''
+
+    def __init__(self, path, features, filled, labels, names):
+        self.path = path
+        self.features = features
+        self.filled = filled
+        self.labels = labels
+        self.names = names
+        self._index = None
+
+    @classmethod
+    def create(cls, path, n_rows, labels, names=None, dtype=np.float32):
+        '''
+        Parameters
+        ----------
+        path : str
+            Path of the feature matrix (.npy); sidecar files are placed next
+            to it.
+        n_rows : int
+            Number of rows (images).
+        labels : list
+            Labels of features.
+        names : list, optional
+            Name of each row. The default is None.
+        dtype : numpy dtype, optional
+            np.float32 or np.float64. The default is np.float32.
+
+        Returns
+        -------
+        store : FeatureStore
+            Store opened for writing, with all rows unfilled.
+        '''
+        path, path_filled, path_json = _paths(path)
+        if names is not None and len(names) != n_rows:
+            raise ValueError('Number of names must match number of rows')
+        features = np.lib.format.open_memmap(path, mode='w+', dtype=np.dtype(dtype),
+                                             shape=(n_rows, len(labels)))
+        filled = np.lib.format.open_memmap(path_filled, mode='w+', dtype=np.uint8,
+                                           shape=(n_rows,))
+        with open(path_json, 'w') as fp:
+            json.dump({'labels': list(labels), 'names': None if names is None else list(names),
+                       'dtype': np.dtype(dtype).str}, fp)
+        return cls(path, features, filled, list(labels), names)
+
+    @classmethod
+    def open(cls, path, mode='r'):
+        '''
+        Parameters
+        ----------
+        path : str
+            Path of the feature matrix (.npy).
+        mode : str, optional
+            'r' to read, 'r+' to write rows. The default is 'r'.
+        '''
+        path, path_filled, path_json = _paths(path)
+        with open(path_json) as fp:
+            meta = json.load(fp)
+        features = np.load(path, mmap_mode=mode)
+        filled = np.load(path_filled, mmap_mode=mode)
+        return cls(path, features, filled, meta['labels'], meta['names'])
+
+    def __len__(self):
+        return self.features.shape[0]
+
+    def write(self, i, features):
+        '''
+        Write the features of row i and mark it as filled.
+        '''
+        features = np.asarray(features).ravel()
+        if features.shape[0] != self.features.shape[1]:
+            raise ValueError('Row ' + str(i) + ' has ' + str(features.shape[0]) +
+                             ' features instead of ' + str(self.features.shape[1]))
+        self.features[i] = features
+        self.filled[i] = 1
+
+    def index(self, name):
+        '''
+        Row of the given name.
+        '''
+        if self._index is None:
+            self._index = {n: i for i, n in enumerate(self.names or [])}
+        return self._index[name]
+
+    def missing(self):
+        '''
+        Rows not written yet.
+        '''
+        return np.flatnonzero(np.asarray(self.filled) == 0)
+
+    def iter_batches(self, batch_size=1024, filled_only=True):
+        '''
+        Yield (rows, features) of consecutive row blocks, reading one block
+        at a time; with filled_only, rows not written are left out.
+        '''
+        for start in range(0, len(self), batch_size):
+            rows = np.arange(start, min(start + batch_size, len(self)))
+            if filled_only:
+                rows = rows[np.asarray(self.filled[rows[0]:rows[-1]+1]) == 1]
+            yield rows, np.asarray(self.features[rows])
+
+    def flush(self):
+        if isinstance(self.features, np.memmap):
+            self.features.flush()
+            self.filled.flush()
@@ -1,28 +1,50 @@
+# Functions named as their module must be bound here, before any import of
+# the module can shadow them; the rest are imported on first access.
+from .._lazy import attach
 from .fos import fos
-from .glcm import glcm_features
-from .glds import glds_features
-from .ngtdm import ngtdm_features
-from .sfm import sfm_features
-from .lte import lte_measures
 from .fdta import fdta
-from .glrlm import glrlm_features
 from .fps import fps
-from .shape_parameters import shape_parameters
-from .hos_v2 import hos_features, plot_sinogram
-from .lbp import lbp_features
-from .glszm import glszm_features
 
 __all__ = [
-    'fos',
-    'glcm_features',
-    'glds_features',
+    'fos', 'fos_batch',
+    'glcm_matrices', 'glcm_features', 'glcm_features_batch', 'haralick_features',
+    'glcm_sparse', 'haralick_features_sparse',
+    'GLCMAccumulator', 'glcm_tiles', 'glcm_features_tiled',
+    'glds_features', 'glds_features_batch',
     'ngtdm_features',
     'sfm_features',
-    'lte_measures',
+    'lte_measures', 'lte_measures_batch',
     'fdta',
-    'glrlm_features',
+    'glrlm_features', 'glrlm_compact',
     'fps',
     'shape_parameters',
     'hos_features','plot_sinogram',
     'lbp_features',
-    'glszm_features']
\ No newline at end of file
+    'glszm_features', 'glszm_triplets']
+
+_modules = {'fos_batch': '.fos',
+            'glcm_matrices': '.glcm',
+            'glcm_features': '.glcm',
+            'glcm_features_batch': '.glcm',
+            'haralick_features': '.glcm',
+            'glcm_sparse': '.glcm',
+            'haralick_features_sparse': '.glcm',
+            'GLCMAccumulator': '.glcm',
+            'glcm_tiles': '.glcm',
+            'glcm_features_tiled': '.glcm',
+            'glds_features': '.glds',
+            'glds_features_batch': '.glds',
+            'ngtdm_features': '.ngtdm',
+            'sfm_features': '.sfm',
+            'lte_measures': '.lte',
+            'lte_measures_batch': '.lte',
+            'glrlm_features': '.glrlm',
+            'glrlm_compact': '.glrlm',
+            'shape_parameters': '.shape_parameters',
+            'hos_features': '.hos_v2',
+            'plot_sinogram': '.hos_v2',
+            'lbp_features': '.lbp',
+            'glszm_features': '.glszm',
+            'glszm_triplets': '.glszm'}
+
+__getattr__, __dir__ = attach(__name__, _modules)
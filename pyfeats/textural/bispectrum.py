@@ -6,7 +6,6 @@ from __future__ import division
 import numpy as np
 from scipy.linalg import hankel
 from scipy.signal import convolve2d
-import matplotlib.pyplot as plt
 
 def _nextpow2(num):
   npow = 2
@@ -28,41 +28,31 @@ def _intensity(f, mask, s):
     '''
     Intensity difference vector with step 
     '''
-    n1, n2, cn1, cn2 = 0, 0, 0, 0
-    N1, N2 = f.shape
-    IDV = np.zeros((s), np.double)
-        
-    for k in range(1,s+1):
-        for x1 in range(0,N1):
-            for y1  in range(0,N2-k):
-                if (mask[x1,y1] == 1) & (mask[x1,y1+k] == 1):
-                    n1 += np.abs(f[x1,y1]-f[x1,y1+k])
-                    cn1 += 1
+    inside = (mask == 1)
+    n = np.zeros((s), np.double)
+    cn = np.zeros((s), np.double)
     
-        for x2 in range(0,N1-k):
-            for y2 in range(0,N2):
-                if (mask[x2,y2] == 1) & (mask[x2+k,y2] == 1):
-                    n2 += np.abs(f[x2,y2]-f[x2+k,y2])
-                    cn2 += 1
-        IDV[k-1] = (n1+n2)/(cn1+cn2+1e-16)
+    # Mean absolute difference of pairs inside mask at distance k along rows
+    # and columns, accumulated over k = 1..s
+    for k in range(1,s+1):
+        valid1 = inside[:,:-k] & inside[:,k:]
+        valid2 = inside[:-k,:] & inside[k:,:]
+        n[k-1] = np.abs(f[:,:-k] - f[:,k:])[valid1].sum() + \
+                 np.abs(f[:-k,:] - f[k:,:])[valid2].sum()
+        cn[k-1] = valid1.sum() + valid2.sum()
+    IDV = n.cumsum() / (cn.cumsum() + 1e-16)
           
     return IDV
 
 
-def _resolution(x, mask, mr, mc):  
+def _resolution(x, mask, nr, nc):  
     '''
-    Multiple resolution feature exctraction
+    Multiple resolution feature exctraction: average of 2 x 2 blocks of the 
+    first nr x nc blocks
     '''
-    nr = (2 ** mr) - 1
-    nc = (2 ** mc) - 1  
-    nr_int = nr.astype('i')
-    nc_int = nc.astype('i')
-    res = np.zeros((nr_int,nc_int), np.double)
-    res_mask = np.zeros((nr_int,nc_int), np.double)
-    for i in range(0,nr_int):
-        for j in range(0,nc_int):
-            res[i,j]=(x[(2*i),(2*j)]+x[(2*i+1),(2*j)]+x[(2*i),(2*j+1)]+x[(2*i+1),(2*j+1)])/4
-            res_mask[i,j]=(mask[(2*i),(2*j)]+mask[(2*i+1),(2*j)]+mask[(2*i),(2*j+1)]+mask[(2*i+1),(2*j+1)])/4
+    nr, nc = max(nr,0), max(nc,0)
+    res = x[:2*nr,:2*nc].reshape(nr,2,nc,2).mean(axis=(1,3))
+    res_mask = mask[:2*nr,:2*nc].reshape(nr,2,nc,2).mean(axis=(1,3))
     res_mask[res_mask>1] = 1
     return res, res_mask
     
@@ -92,7 +82,8 @@ def fdta(f, mask, s=3):
         
     labels = ["FDTA_HurstCoeff"] * (s+1)
     labels = [label + "_" + str(i+1) for i,label in enumerate(labels)]
-    f = np.array(f, np.double)
+    f = np.asarray(f, np.double)
+    mask = np.asarray(mask, np.double)
     N1, N2 = f.shape
     h = np.zeros((s+1), np.double)
     h[s] = 0
@@ -100,13 +91,10 @@ def fdta(f, mask, s=3):
     i = 0
     IDV = _intensity(f,mask,ms)
     h[i] = _least(IDV,ms)
-    mr = np.log2(N1)
-    mc = np.log2(N2)
     while (i < s):
         i = i + 1
-        mr = mr - 1
-        mc = mc - 1
-        f, mask = _resolution(f,mask,mr,mc)
+        # Image pyramid: level i has N // 2**i - 1 rows and columns
+        f, mask = _resolution(f,mask,N1//2**i-1,N2//2**i-1)
         IDV = _intensity(f,mask,ms)
         h[i] = _least(IDV,ms)
     return h, labels 
@@ -8,7 +8,7 @@
 
 import numpy as np
 
-def fos(f, mask):
+def fos(f, mask, roi=None):
     '''
     Parameters
     ----------
@@ -17,6 +17,9 @@ def fos(f, mask):
     mask : numpy ndarray
         Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else. Give None
         if you want to consider ROI the whole image.
+    roi : numpy ndarray, optional
+        Gray levels of the pixels inside the ROI if already computed, e.g. by
+        FeatureExtractor. The default is None (extracted from f and mask).
 
     Returns
     -------
@@ -40,17 +43,18 @@ def fos(f, mask):
               "FOS_90Percentile","FOS_HistogramWidth"]
     
     # 2) Parameters
-    f  = f.astype(np.uint8)
-    mask = mask.astype(np.uint8)
+    f  = f.astype(np.uint8, copy=False)
+    mask = mask.astype(np.uint8, copy=False)
     level_min = 0
     level_max = 255
     Ng = (level_max - level_min) + 1
     bins = Ng
     
     # 3) Calculate Histogram H inside ROI
-    f_ravel = f.ravel() 
-    mask_ravel = mask.ravel() 
-    roi = f_ravel[mask_ravel.astype(bool)] 
+    if roi is None:
+        f_ravel = f.ravel() 
+        mask_ravel = mask.ravel() 
+        roi = f_ravel[mask_ravel.astype(bool)] 
     H = np.histogram(roi, bins=bins, range=[level_min, level_max], density=True)[0]
     
     # 4) Calculate Features
@@ -74,3 +78,78 @@ def fos(f, mask):
     features[15] = features[14] - features[11]
     
     return features, labels
+
+def fos_batch(f, mask):
+    '''
+    Parameters
+    ----------
+    f : numpy ndarray
+        Stack of K images of dimensions K x N1 x N2.
+    mask : numpy ndarray
+        Stack of K masks K x N1 x N2 with 1 if pixels belongs to ROI, 0 else.
+        Give None if you want to consider ROI the whole image.
+
+    Returns
+    -------
+    features : numpy ndarray
+        Features of fos for each image (K x 16).
+    labels : list
+        Labels of features.
+    '''
+    if mask is None:
+        mask = np.ones(f.shape)
+        
+    # 1) Labels
+    labels = ["FOS_Mean","FOS_Variance","FOS_Median","FOS_Mode","FOS_Skewness",
+              "FOS_Kurtosis","FOS_Energy","FOS_Entropy","FOS_MinimalGrayLevel",
+              "FOS_MaximalGrayLevel","FOS_CoefficientOfVariation",
+              "FOS_10Percentile","FOS_25Percentile","FOS_75Percentile",
+              "FOS_90Percentile","FOS_HistogramWidth"]
+    
+    # 2) Parameters
+    f = f.astype(np.uint8, copy=False)
+    mask = mask.astype(bool, copy=False)
+    K = f.shape[0]
+    level_min = 0
+    level_max = 255
+    Ng = (level_max - level_min) + 1
+    bins = Ng
+    
+    # 3) Calculate Histogram inside ROI of all images with one bincount; the
+    # density histogram has bins of width (level_max-level_min)/bins.
+    offset = (np.arange(K) * bins).reshape(-1,1,1)
+    counts = np.bincount((f.astype(np.int64) + offset)[mask], 
+                         minlength=K*bins).reshape(K,bins).astype(np.double)
+    n = counts.sum(axis=1)
+    H = counts / (n * (level_max-level_min) / bins).reshape(-1,1)
+    
+    # 4) Percentiles (linear interpolation) from the cumulative histogram
+    cum = np.cumsum(counts, axis=1)
+    def percentile(q):
+        pos = q / 100 * (n - 1)
+        lo = np.floor(pos)
+        lo_value = (cum <= lo.reshape(-1,1)).sum(axis=1)
+        hi_value = (cum <= np.minimum(lo+1, n-1).reshape(-1,1)).sum(axis=1)
+        return lo_value + (hi_value - lo_value) * (pos - lo)
+    
+    # 5) Calculate Features
+    features = np.zeros((K,16),np.double)  
+    i = np.arange(0,bins)
+    features[:,0] = H @ i
+    features[:,1] = (((i-features[:,[0]])**2) * H).sum(axis=1)
+    features[:,2] = percentile(50)
+    features[:,3] = np.argmax(H, axis=1)
+    features[:,4] = (((i-features[:,[0]])**3) * H).sum(axis=1)/(np.sqrt(features[:,1])**3)
+    features[:,5] = (((i-features[:,[0]])**4) * H).sum(axis=1)/(np.sqrt(features[:,1])**4)
+    features[:,6] = (H*H).sum(axis=1)
+    features[:,7] = -(H*np.log(H+1e-16)).sum(axis=1)
+    features[:,8] = np.argmax(counts > 0, axis=1)
+    features[:,9] = bins - 1 - np.argmax(counts[:,::-1] > 0, axis=1)
+    features[:,10] = np.sqrt(features[:,2]) / features[:,0]
+    features[:,11] = percentile(10)
+    features[:,12] = percentile(25)
+    features[:,13] = percentile(75)
+    features[:,14] = percentile(90)
+    features[:,15] = features[:,14] - features[:,11]
+    
+    return features, labels
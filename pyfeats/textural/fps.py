@@ -10,7 +10,38 @@
 
 import numpy as np
 
-# FIXME
+def _segments(msk, L):
+    '''
+    Segments [start, end) of the lines of msk (M x N) that are transformed,
+    as scanned by the original loops: the last pixel of a line is never 
+    tested, so a run of 1 reaching it is extended to the end of the line, and 
+    a run closed at position L or beyond keeps its closing pixel.
+
+    Returns
+    -------
+    line, start, end : numpy ndarray
+    '''
+    M, N = msk.shape
+    m = np.zeros((M,N+1), np.int8)
+    m[:,1:N] = msk[:,:N-1]
+    d = np.diff(m, axis=1)
+    line, start = np.nonzero(d == 1)
+    end = np.nonzero(d == -1)[1]
+    end = np.where(end < N-1, np.where(end+1 < L, end, end+1), 
+                   N-1 if N < L else N)
+    return line, start, end
+
+def _fft_segments(x, msk, L, out):
+    # FFT of each segment of the lines of x, written to out: one batched FFT
+    # for all segments of the same length
+    line, start, end = _segments(msk, L)
+    length = end - start
+    for n in np.unique(length):
+        k = length == n
+        rows = line[k][:,np.newaxis]
+        cols = start[k][:,np.newaxis] + np.arange(n)
+        out[rows,cols] = np.fft.fft(x[rows,cols], axis=1)
+
 def _fft2(x,msk):
     '''
     Parameters
@@ -23,56 +54,16 @@ def _fft2(x,msk):
     Returns
     -------
     F : numpy ndarray
-        2D Fourier Transform inside msk.
+        2D Fourier Transform inside msk: 1D FFT of each segment of each 
+        column inside msk, then of each segment of each row.
     '''
     N1,N2 = x.shape
     F = np.zeros((N1,N2), np.complex64)
+    msk = (msk == 1)
     
-    for i in range(1,N2+1):
-      sp = 0
-      ep = 0
-      j = 1
-      while (j < N1):
-          while (msk[j-1,i-1]==1) & (j < N1):
-              if (sp == 0):
-                  sp = j
-              j += 1
-          if (sp > 0) & (ep == 0):
-              if (j < N1):
-                  ep = j-1
-              else:
-                  ep = j      
-              F[(sp-1):(ep),i-1] = np.fft.fft(x[(sp-1):(ep),i-1])
-              sp = 0
-              ep = 0
-          while (msk[j-1,i-1] == 0) & (j < N1):
-              j += 1
-
-    F = F.T
-    msk = msk.T
-    
-    for i in range(1,N1+1):
-        sp = 0
-        ep = 0
-        j = 1
-        while (j < N2):
-          while (msk[j-1,i-1] == 1) & (j < N2):
-              if (sp == 0):
-                  sp = j
-              j += 1
-          if (sp > 0) & (ep == 0):
-              if (j < N1):
-                  ep = j-1
-              else:
-                  ep = j     
-              F[(sp-1):(ep),i-1] = np.fft.fft(F[(sp-1):(ep),i-1])
-              sp = 0
-              ep = 0
-          while (msk[j-1,i-1] == 0) & (j < N2):
-              j += 1
-
-    F = F.T
-    msk = msk.T
+    # Columns (F.T is a view of F), then rows
+    _fft_segments(x.T, msk.T, N1, F.T)
+    _fft_segments(F, msk, N1, F)
     return F
 
 def fps(f, mask):
@@ -100,8 +91,8 @@ def fps(f, mask):
     labels = ["FPS_RadialSum", "FPS_AngularSum"]
     
     # 2) Parameters
-    f = np.array(f, np.double)
-    mask = np.array(mask, np.double)
+    f = np.asarray(f, np.double)
+    mask = np.asarray(mask, np.double)
      
     # 3) Calculate Features
     area = mask.sum()
@@ -111,7 +102,7 @@ def fps(f, mask):
     #F_real = np.multiply(F_real, mask)
     #F_imag = np.multiply(F_imag, mask)
     features = np.zeros(2 ,np.double)
-    features[0] = np.sqrt(sum(sum(np.multiply(F_real,F_real)))/area)
-    features[1] = np.sqrt(sum(sum(np.multiply(F_imag,F_imag)))/area)
+    features[0] = np.sqrt(np.multiply(F_real,F_real,dtype=np.double).sum()/area)
+    features[1] = np.sqrt(np.multiply(F_imag,F_imag,dtype=np.double).sum()/area)
     return features, labels
  
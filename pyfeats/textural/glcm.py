@@ -7,9 +7,389 @@
 ==============================================================================
 """
 import numpy as np
-import mahotas
+from ..profiling import stage
 
-def glcm_features(f, ignore_zeros=True):
+# Unit offsets (row, column) of directions 0, 45 (down-right), 90 and 135
+# degrees, in the order of mahotas
+OFFSETS = [(0,1), (1,1), (1,0), (1,-1)]
+
+def _shifted(a, dy, dx):
+    # Views of a at pixels p and p + (dy,dx), for all p with both in a; the
+    # last two axes are the image axes
+    N1, N2 = a.shape[-2:]
+    r0, r1 = max(0,-dy), N1 - max(0,dy)
+    c0, c1 = max(0,-dx), N2 - max(0,dx)
+    return a[...,r0:r1,c0:c1], a[...,r0+dy:r1+dy,c0+dx:c1+dx]
+
+def _levels(f, mask):
+    # Max gray level in ROI + 1 of each image of a stack (1 if ROI is empty)
+    if mask is not None:
+        f = np.where(mask, f, 0)
+    return f.reshape(f.shape[0],-1).max(1).astype(np.intp) + 1
+
+def glcm_matrices(f, mask=None, distances=1, offsets=OFFSETS, Ng=None, symmetric=True):
+    '''
+    Parameters
+    ----------
+    f : numpy ndarray
+        Image of dimensions N1 x N2, of non-negative integer gray levels, or
+        stack of K images K x N1 x N2.
+    mask : numpy ndarray, optional
+        Mask image N1 x N2 (or stack of masks) with 1 if pixels belongs to
+        ROI, 0 else. A pair is counted only if both pixels belong to ROI.
+        Give None if you want to consider ROI the whole image.
+    distances : int or list, optional
+        Distance of pixel pairs, or list of distances. The default is 1.
+    offsets : list, optional
+        Unit offsets (row, column) of directions. The default is OFFSETS:
+        0, 45, 90 and 135 degrees.
+    Ng : int, optional
+        Number of gray levels. The default is max gray level in ROI + 1.
+    symmetric : bool, optional
+        Count each pair in both orders. The default is True.
+
+    Returns
+    -------
+    P : numpy ndarray
+        Co-occurrence matrices (counts) of each distance and offset,
+        len(distances)*len(offsets) x Ng x Ng, ordered by distance first;
+        for a stack, K x len(distances)*len(offsets) x Ng x Ng.
+    '''
+    f = np.asarray(f)
+    stack = f.ndim == 3
+    if not stack:
+        f = f[np.newaxis]
+    if mask is not None:
+        mask = np.asarray(mask).astype(bool, copy=False).reshape(f.shape)
+    if Ng is None:
+        Ng = int(_levels(f, mask).max())
+    K = f.shape[0]
+    # Pairs of all images are counted with one bincount per offset
+    f = f.astype(np.intp) + (np.arange(K) * Ng).reshape(-1,1,1)
+    distances = np.atleast_1d(distances)
+    P = np.zeros((len(distances)*len(offsets), K, Ng, Ng), np.int64)
+    k = 0
+    for d in distances:
+        for dy, dx in offsets:
+            a, b = _shifted(f, d*dy, d*dx)
+            index = a * Ng + b % Ng
+            if mask is not None:
+                ma, mb = _shifted(mask, d*dy, d*dx)
+                index = index[ma & mb]
+            P[k] = np.bincount(index.ravel(), minlength=K*Ng*Ng).reshape(K,Ng,Ng)
+            k += 1
+    if symmetric:
+        P += P.transpose(0,1,3,2)
+    P = P.transpose(1,0,2,3)
+    return P if stack else P[0]
+
+def _entropy(p, axis):
+    # Entropy in bits, 0 log 0 = 0
+    return -(p * np.log2(p + (p==0))).sum(axis)
+
+def _patterns(px):
+    # Groups of matrices with the same gray levels present: pattern of levels
+    # present and matrices of each group
+    present = px != 0
+    patterns, inverse = np.unique(present, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    return [(pattern, np.flatnonzero(inverse == g)) for g, pattern in enumerate(patterns)]
+
+def _second_eigenvalue(q):
+    # Square root of second largest eigenvalue of the correlation matrix of
+    # the rows of each matrix of q (n x G x G), with one batched eigvalsh
+    # Correlation matrices as np.corrcoef
+    q = q - q.mean(2, keepdims=True)
+    C = q @ q.transpose(0,2,1)
+    std = np.sqrt(np.diagonal(C, axis1=1, axis2=2))
+    C = C / std[:,:,np.newaxis] / std[:,np.newaxis,:]
+    np.clip(C, -1, 1, out=C)
+    return np.sqrt(np.linalg.eigvalsh(C)[:,-2])
+
+def _maximal_correlation(p, px):
+    # Maximal correlation coefficient over gray levels present. Matrices with
+    # the same levels present are solved together.
+    features = np.zeros(p.shape[0], np.double)
+    for pattern, ks in _patterns(px):
+        if pattern.sum() <= 2:
+            continue
+        features[ks] = _second_eigenvalue(p[ks][:,pattern][:,:,pattern])
+    return features
+
+def haralick_features(P, ignore_zeros=True, compute_14th_feature=True, Ng=None):
+    '''
+    Parameters
+    ----------
+    P : numpy ndarray
+        Stack of K co-occurrence matrices K x Ng x Ng (counts or
+        probabilities), e.g. of several directions, distances and images.
+    ignore_zeros : int, optional
+        Ignore gray level 0. The default is True.
+    compute_14th_feature : bool, optional
+        Compute the maximal correlation coefficient, which needs an
+        eigendecomposition of each matrix. The default is True.
+    Ng : int or numpy ndarray, optional
+        Number of gray levels of each matrix, when matrices of fewer levels
+        are zero padded to a common size. The default is the size of P.
+
+    Returns
+    -------
+    features : numpy ndarray
+        Haralick's 14 features of each matrix (K x 14), computed as in
+        mahotas; the 14th is 0 if not computed.
+    '''
+    P = np.array(P, np.double, ndmin=3)
+    if ignore_zeros:
+        P[:,0] = 0
+        P[:,:,0] = 0
+    K, N, _ = P.shape
+    T = P.sum((1,2))
+    if (T == 0).any():
+        raise ValueError('glcm_features: no pixel pairs in ROI. This can happen if you are using ignore_zeros')
+    Ng = np.broadcast_to(N if Ng is None else Ng, (K,)).reshape(-1,1)
+    p = P / T.reshape(-1,1,1)
+    k = np.arange(N)
+    i, j = np.ogrid[:N,:N]
+    px = p.sum(1)
+    py = p.sum(2)
+    ux, uy = px @ k, py @ k
+    vx = px @ k**2 - ux**2
+    vy = py @ k**2 - uy**2
+    sx, sy = np.sqrt(vx), np.sqrt(vy)
+    
+    # Sum and difference distributions of all matrices with one bincount
+    offset = np.arange(K).reshape(-1,1,1)
+    px_plus_y = np.bincount((offset*2*N + i+j).ravel(), p.ravel(),
+                            minlength=K*2*N).reshape(K,2*N)
+    px_minus_y = np.bincount((offset*N + np.abs(i-j)).ravel(), p.ravel(),
+                             minlength=K*N).reshape(K,N)
+    tk = np.arange(2*N)
+
+    features = np.zeros((K,14), np.double)
+    pp = p.reshape(K,-1)
+    features[:,0] = np.einsum('ki,ki->k', pp, pp)
+    features[:,1] = px_minus_y @ k**2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = (np.einsum('kij,i,j->k', p, k, k) - ux * uy) / sx / sy
+    features[:,2] = np.where((sx == 0) | (sy == 0), 1, correlation)
+    features[:,3] = vx
+    features[:,4] = np.einsum('kij,ij->k', p, 1. / (1. + (i-j)**2))
+    features[:,5] = px_plus_y @ tk
+    features[:,6] = px_plus_y @ tk**2 - features[:,5]**2
+    features[:,7] = _entropy(px_plus_y, 1)
+    features[:,8] = _entropy(pp, 1)
+    # Variance of the difference distribution over its Ng entries
+    valid = k < Ng
+    mean = px_minus_y.sum(1, keepdims=True) / Ng
+    features[:,9] = (((px_minus_y - mean) * valid)**2).sum(1) / Ng.ravel()
+    features[:,10] = _entropy(px_minus_y, 1)
+    # Entropies of the product of marginals are separable: log2(px*py) is
+    # log2(px) + log2(py) where both are nonzero, 0 else
+    HX, HY = _entropy(px, 1), _entropy(py, 1)
+    log_px = np.log2(px + (px==0))
+    log_py = np.log2(py + (py==0))
+    HXY1 = -(np.einsum('ki,kij,kj->k', log_px, p, py != 0) + 
+             np.einsum('kj,kij,ki->k', log_py, p, px != 0))
+    HXY2 = HX * py.sum(1) + HY * px.sum(1)
+    HXY = np.maximum(HX, HY)
+    features[:,11] = (features[:,8] - HXY1) / np.where(HXY != 0, HXY, 1)
+    features[:,12] = np.sqrt(np.maximum(0, 1 - np.exp(-2 * (HXY2 - features[:,8]))))
+    if compute_14th_feature:
+        features[:,13] = _maximal_correlation(p, px)
+    return features
+
+def glcm_sparse(f, mask=None, distances=1, offsets=OFFSETS, symmetric=True):
+    '''
+    Co-occurrence matrices in coordinate (COO) form: only gray level pairs
+    that occur are stored, so memory grows with the number of distinct
+    pairs instead of Ng x Ng, e.g. for 12 or 16 bit images.
+
+    Parameters
+    ----------
+    f : numpy ndarray
+        Image of dimensions N1 x N2, of integer gray levels.
+    mask : numpy ndarray, optional
+        Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else. A pair
+        is counted only if both pixels belong to ROI. Give None if you want
+        to consider ROI the whole image.
+    distances : int or list, optional
+        Distance of pixel pairs, or list of distances. The default is 1.
+    offsets : list, optional
+        Unit offsets (row, column) of directions. The default is OFFSETS.
+    symmetric : bool, optional
+        Count each pair in both orders. The default is True.
+
+    Returns
+    -------
+    levels : numpy ndarray
+        Gray levels present in ROI, sorted.
+    k : numpy ndarray
+        Matrix of each entry, ordered by distance first as in glcm_matrices.
+    i : numpy ndarray
+        Row of each entry, as index in levels.
+    j : numpy ndarray
+        Column of each entry, as index in levels.
+    counts : numpy ndarray
+        Number of pairs of each entry.
+    '''
+    f = np.asarray(f)
+    if mask is not None:
+        mask = np.asarray(mask).astype(bool, copy=False)
+    levels = np.unique(f if mask is None else f[mask])
+    L = max(len(levels), 1)
+    # Index of each pixel in levels (pixels outside ROI are never counted)
+    f = np.minimum(np.searchsorted(levels, f), L - 1).astype(np.int64)
+    distances = np.atleast_1d(distances)
+    codes = []
+    n = 0
+    for d in distances:
+        for dy, dx in offsets:
+            a, b = _shifted(f, d*dy, d*dx)
+            if mask is not None:
+                ma, mb = _shifted(mask, d*dy, d*dx)
+                a, b = a[ma & mb], b[ma & mb]
+            codes.append((n * L + a.ravel()) * L + b.ravel())
+            if symmetric:
+                codes.append((n * L + b.ravel()) * L + a.ravel())
+            n += 1
+    # Count all distinct (matrix, row, column) codes with one sort
+    codes, counts = np.unique(np.concatenate(codes), return_counts=True)
+    k, ij = np.divmod(codes, L * L)
+    i, j = np.divmod(ij, L)
+    return levels, k, i, j, counts
+
+def _group(k, values):
+    # Groups of entries of the same matrix k with equal integer values: index
+    # of each entry in the groups, and matrix of each group
+    low = values.min() if len(values) > 0 else 0
+    span = values.max() - low + 1 if len(values) > 0 else 1
+    keys, inverse = np.unique(k * span + (values - low), return_inverse=True)
+    return inverse.ravel(), keys // span
+
+def haralick_features_sparse(levels, k, i, j, counts, ignore_zeros=True, 
+                             compute_14th_feature=True, Ng=None, K=None):
+    '''
+    Haralick features of co-occurrence matrices in coordinate form, as
+    returned by glcm_sparse, computed over their nonzero entries only.
+
+    Parameters
+    ----------
+    levels, k, i, j, counts : numpy ndarray
+        Co-occurrence matrices, see glcm_sparse.
+    ignore_zeros : int, optional
+        Ignore gray level 0. The default is True.
+    compute_14th_feature : bool, optional
+        Compute the maximal correlation coefficient. It needs a dense matrix
+        of the gray levels present in each matrix. The default is True.
+    Ng : int, optional
+        Number of gray levels, over which the difference variance is taken.
+        The default is max gray level + 1, as in glcm_features.
+    K : int, optional
+        Number of matrices. The default is max(k) + 1.
+
+    Returns
+    -------
+    features : numpy ndarray
+        Haralick's 14 features of each matrix (K x 14), equal to those of
+        haralick_features on the dense matrices.
+    '''
+    levels = np.asarray(levels)
+    if Ng is None:
+        Ng = int(levels.max()) + 1 if len(levels) > 0 else 1
+    if K is None:
+        K = int(k.max()) + 1 if len(k) > 0 else 1
+    if ignore_zeros and len(levels) > 0 and levels[0] == 0:
+        keep = (i != 0) & (j != 0)
+        k, i, j, counts = k[keep], i[keep], j[keep], counts[keep]
+    L = len(levels)
+    T = np.bincount(k, counts, minlength=K)
+    if (T == 0).any():
+        raise ValueError('glcm_features: no pixel pairs in ROI. This can happen if you are using ignore_zeros')
+    p = counts / T[k]
+    g = levels.astype(np.double)
+    gi, gj = g[i], g[j]
+    levels = levels.astype(np.int64)
+    px = np.bincount(k * L + j, p, minlength=K*L).reshape(K,L)
+    py = np.bincount(k * L + i, p, minlength=K*L).reshape(K,L)
+    ux, uy = px @ g, py @ g
+    vx = px @ g**2 - ux**2
+    vy = py @ g**2 - uy**2
+    sx, sy = np.sqrt(vx), np.sqrt(vy)
+    
+    # Sum and difference distributions over the sums and differences that
+    # occur
+    group, kg = _group(k, levels[i] + levels[j])
+    px_plus_y = np.bincount(group, p)
+    group, kg_minus = _group(k, np.abs(levels[i] - levels[j]))
+    px_minus_y = np.bincount(group, p)
+    s, d = gi + gj, np.abs(gi - gj)
+    
+    def total(values):
+        return np.bincount(k, values, minlength=K)
+    def entropy(values, kv):
+        return -np.bincount(kv, values * np.log2(values + (values==0)), minlength=K)
+    
+    features = np.zeros((K,14), np.double)
+    features[:,0] = total(p * p)
+    features[:,1] = total(p * d**2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = (total(p * gi * gj) - ux * uy) / sx / sy
+    features[:,2] = np.where((sx == 0) | (sy == 0), 1, correlation)
+    features[:,3] = vx
+    features[:,4] = total(p / (1. + d**2))
+    features[:,5] = total(p * s)
+    features[:,6] = total(p * s**2) - features[:,5]**2
+    features[:,7] = entropy(px_plus_y, kg)
+    features[:,8] = entropy(p, k)
+    # Variance of the difference distribution over its Ng entries, which
+    # sum to 1
+    features[:,9] = (np.bincount(kg_minus, px_minus_y**2, minlength=K) - 1. / Ng) / Ng
+    features[:,10] = entropy(px_minus_y, kg_minus)
+    HX = -(px * np.log2(px + (px==0))).sum(1)
+    HY = -(py * np.log2(py + (py==0))).sum(1)
+    log_px = np.log2(px + (px==0))
+    log_py = np.log2(py + (py==0))
+    HXY1 = -total(p * (log_px[k,i] * (py[k,j] != 0) + log_py[k,j] * (px[k,i] != 0)))
+    HXY2 = HX * py.sum(1) + HY * px.sum(1)
+    HXY = np.maximum(HX, HY)
+    features[:,11] = (features[:,8] - HXY1) / np.where(HXY != 0, HXY, 1)
+    features[:,12] = np.sqrt(np.maximum(0, 1 - np.exp(-2 * (HXY2 - features[:,8]))))
+    if compute_14th_feature:
+        # Dense over the levels present only, for each group of matrices 
+        # with the same levels present (in chunks of ~128 MB)
+        slot = np.zeros(K, np.intp)
+        for pattern, group in _patterns(px):
+            G = pattern.sum()
+            if G <= 2:
+                continue
+            index = np.cumsum(pattern) - 1
+            step = max(1, 2**24 // G**2)
+            for start in range(0, len(group), step):
+                ks = group[start:start+step]
+                slot[:] = -1
+                slot[ks] = np.arange(len(ks))
+                entries = (slot[k] >= 0) & pattern[i] & pattern[j]
+                q = np.zeros((len(ks),G,G), np.double)
+                q[slot[k[entries]], index[i[entries]], index[j[entries]]] = p[entries]
+                features[ks,13] = _second_eigenvalue(q)
+    return features
+
+def _labels(distances):
+    labels = ["GLCM_ASM", "GLCM_Contrast", "GLCM_Correlation",
+              "GLCM_SumOfSquaresVariance", "GLCM_InverseDifferenceMoment",
+               "GLCM_SumAverage", "GLCM_SumVariance", "GLCM_SumEntropy",
+               "GLCM_Entropy", "GLCM_DifferenceVariance",
+               "GLCM_DifferenceEntropy", "GLCM_Information1",
+               "GLCM_Information2", "GLCM_MaximalCorrelationCoefficient"]
+    labels_mean = [label + "_Mean" for label in labels]
+    labels_range = [label + "_Range" for label in labels]
+    if not np.isscalar(distances):
+        labels_mean = [label + "_d" + str(d) for d in distances for label in labels_mean]
+        labels_range = [label + "_d" + str(d) for d in distances for label in labels_range]
+    return labels_mean, labels_range
+
+def glcm_features(f, ignore_zeros=True, mask=None, distances=1, offsets=OFFSETS, Ng=None,
+                  sparse=False, compute_14th_feature=True):
     '''
     Parameters
     ----------
@@ -17,6 +397,23 @@ def glcm_features(f, ignore_zeros=True):
         Image of dimensions N1 x N2.
     ignore_zeros : int, optional
         Ignore zeros in image f. The default is True.
+    mask : numpy ndarray, optional
+        Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else; only
+        pairs of ROI pixels are counted. The default is None (whole image).
+    distances : int or list, optional
+        Distance of pixel pairs, or list of distances. The default is 1.
+    offsets : list, optional
+        Unit offsets (row, column) of directions. The default is 0, 45, 90
+        and 135 degrees.
+    Ng : int, optional
+        Number of gray levels. The default is max gray level in ROI + 1.
+    sparse : bool, optional
+        Keep the integer gray levels of f (e.g. 12 or 16 bit) instead of
+        casting to uint8, and count only the gray level pairs that occur.
+        Images of a float type must have integer values. The default is 
+        False.
+    compute_14th_feature : bool, optional
+        Compute the maximal correlation coefficient. The default is True.
 
     Returns
     -------
@@ -27,7 +424,8 @@ def glcm_features(f, ignore_zeros=True):
         Entropy, 9)Entropy, 10)Difference Variance, 11)Difference 
         Entropy, 12)Information Measure of Correlation 1, 
         13)Information Measure of Correlation 2, 14)Maximal 
-        Correlation Coefficient, mean
+        Correlation Coefficient, mean over directions. For a list of
+        distances, the features of each distance one after the other.
     features_range : numpy ndarray
         Haralick's features, same as before but range
     labels_mean : list
@@ -37,24 +435,285 @@ def glcm_features(f, ignore_zeros=True):
     '''
        
     # 1) Labels
-    labels = ["GLCM_ASM", "GLCM_Contrast", "GLCM_Correlation",
-              "GLCM_SumOfSquaresVariance", "GLCM_InverseDifferenceMoment",
-               "GLCM_SumAverage", "GLCM_SumVariance", "GLCM_SumEntropy",
-               "GLCM_Entropy", "GLCM_DifferenceVariance",
-               "GLCM_DifferenceEntropy", "GLCM_Information1",
-               "GLCM_Information2", "GLCM_MaximalCorrelationCoefficient"]
-    labels_mean = [label + "_Mean" for label in labels]
-    labels_range = [label + "_Range" for label in labels]
+    labels_mean, labels_range = _labels(distances)
+    
+    # 2) Parameters
+    if sparse:
+        f = np.asarray(f)
+        if not np.issubdtype(f.dtype, np.integer):
+            if not np.all(np.mod(f, 1) == 0):
+                raise ValueError('glcm_features: sparse=True needs integer gray levels')
+            f = f.astype(np.int64)
+    else:
+        f = f.astype(np.uint8, copy=False)
+    
+    # 3) Calculate Features of all directions and distances at once: Mean 
+    # and Range over directions
+    if sparse:
+        with stage('matrix'):
+            levels, k, i, j, counts = glcm_sparse(f, mask, distances, offsets)
+        K = len(np.atleast_1d(distances)) * len(offsets)
+        features = haralick_features_sparse(levels, k, i, j, counts, ignore_zeros,
+                                            compute_14th_feature, Ng, K)
+    else:
+        with stage('matrix'):
+            P = glcm_matrices(f, mask, distances, offsets, Ng)
+        features = haralick_features(P, ignore_zeros, compute_14th_feature)
+    features = features.reshape(-1, len(offsets), 14)
+    features_mean = features.mean(1).ravel()
+    features_range = np.ptp(features, 1).ravel()
+    
+    return features_mean, features_range, labels_mean, labels_range
+
+def glcm_features_batch(f, mask, ignore_zeros=True, distances=1, offsets=OFFSETS):
+    '''
+    Parameters
+    ----------
+    f : numpy ndarray
+        Stack of K images of dimensions K x N1 x N2.
+    mask : numpy ndarray
+        Stack of K masks K x N1 x N2 with 1 if pixels belongs to ROI, 0 else.
+        Give None if you want to consider ROI the whole image.
+    ignore_zeros : int, optional
+        Ignore zeros in image f. The default is True.
+    distances : int or list, optional
+        Distance of pixel pairs, or list of distances. The default is 1.
+    offsets : list, optional
+        Unit offsets (row, column) of directions. The default is 0, 45, 90
+        and 135 degrees.
+
+    Returns
+    -------
+    features_mean : numpy ndarray
+        Features of glcm_features (mean over directions) for each image.
+    features_range : numpy ndarray
+        Features of glcm_features (range over directions) for each image.
+    labels_mean : list
+        Labels of features_mean.
+    labels_range: list
+        Labels of features_range.
+    '''
+    
+    # 1) Labels
+    labels_mean, labels_range = _labels(distances)
     
     # 2) Parameters
-    f = f.astype(np.uint8)
+    f = f.astype(np.uint8, copy=False)
+    if mask is not None:
+        mask = mask.astype(bool, copy=False)
+    K = f.shape[0]
+    n = len(np.atleast_1d(distances)) * len(offsets)
+    
+    # 3) Matrices of all images, padded to the largest number of levels
+    Ng = _levels(f, mask)
+    with stage('matrix'):
+        P = glcm_matrices(f, mask, distances, offsets, int(Ng.max()))
     
-    # 3) Calculate Features: Mean and Range
-    features = mahotas.features.haralick(f, 
-                                         ignore_zeros=ignore_zeros, 
-                                         compute_14th_feature=True,
-                                         return_mean_ptp=True)
-    features_mean = features[0:14]
-    features_range = features[14:]
+    # 4) Calculate Features of all matrices at once
+    features = haralick_features(P.reshape(K*n, *P.shape[2:]), ignore_zeros, 
+                                 Ng=np.repeat(Ng, n))
+    features = features.reshape(K, -1, len(offsets), 14)
+    features_mean = features.mean(2).reshape(K,-1)
+    features_range = np.ptp(features, 2).reshape(K,-1)
     
     return features_mean, features_range, labels_mean, labels_range
+
+def _halo(distances, offsets):
+    # Largest row or column shift of a pixel pair
+    return int(np.max(distances)) * max(max(abs(dy), abs(dx)) for dy, dx in offsets)
+
+class GLCMAccumulator:
+    '''
+    Co-occurrence counts of an image added tile by tile, for images that do
+    not fit in memory. Each tile is given with a halo of neighbour pixels
+    (see halo) around the core of pixels it owns; a pair is counted by the
+    tile owning its first pixel, so every pair of the image is counted once.
+    Accumulators of different tiles (e.g. of different workers) are merged
+    with merge or +=, and the features of the merged counts equal those of
+    glcm_features on the whole image.
+
+    Parameters
+    ----------
+    distances : int or list, optional
+        Distance of pixel pairs, or list of distances. The default is 1.
+    offsets : list, optional
+        Unit offsets (row, column) of directions. The default is OFFSETS.
+    Ng : int, optional
+        Number of gray levels. With 256 (the default) tiles are cast to uint8
+        as in glcm_features.
+    symmetric : bool, optional
+        Count each pair in both orders. The default is True.
+    '''
+
+    def __init__(self, distances=1, offsets=OFFSETS, Ng=256, symmetric=True):
+        self.distances = distances
+        self.offsets = list(offsets)
+        self.Ng = Ng
+        self.symmetric = symmetric
+        n = len(np.atleast_1d(distances)) * len(self.offsets)
+        self.counts = np.zeros((n, Ng, Ng), np.int64)
+        # Max gray level in ROI so far, -1 if none
+        self.max_level = -1
+
+    @property
+    def halo(self):
+        '''Pixels of halo needed on each side of a tile core.'''
+        return _halo(self.distances, self.offsets)
+
+    def add(self, tile, mask=None, core=None):
+        '''
+        Parameters
+        ----------
+        tile : numpy ndarray
+            Image tile, including its halo.
+        mask : numpy ndarray, optional
+            Mask of the tile with 1 if pixels belongs to ROI, 0 else. The
+            default is None (whole tile).
+        core : tuple, optional
+            (row_start, row_stop, col_start, col_stop) of the pixels the
+            tile owns, in tile coordinates. The default is the whole tile.
+        '''
+        tile = np.asarray(tile)
+        if self.Ng == 256:
+            tile = tile.astype(np.uint8, copy=False)
+        if mask is not None:
+            mask = np.asarray(mask).astype(bool, copy=False)
+        N1, N2 = tile.shape
+        r0, r1, c0, c1 = (0, N1, 0, N2) if core is None else core
+        roi = tile[r0:r1,c0:c1]
+        if mask is not None:
+            roi = roi[mask[r0:r1,c0:c1]]
+        if roi.size > 0:
+            self.max_level = max(self.max_level, int(roi.max()))
+            if self.max_level >= self.Ng:
+                raise ValueError('Gray level ' + str(self.max_level) + ' is not below Ng=' + str(self.Ng))
+        tile = tile.astype(np.intp)
+        Ng = self.Ng
+        k = 0
+        for d in np.atleast_1d(self.distances):
+            for dy, dx in self.offsets:
+                dy, dx = d*dy, d*dx
+                # First pixels in core whose neighbour is in the tile
+                lo, hi = max(r0, -dy), min(r1, N1 - dy)
+                clo, chi = max(c0, -dx), min(c1, N2 - dx)
+                if lo < hi and clo < chi:
+                    index = tile[lo:hi,clo:chi] * Ng + tile[lo+dy:hi+dy,clo+dx:chi+dx]
+                    if mask is not None:
+                        index = index[mask[lo:hi,clo:chi] & mask[lo+dy:hi+dy,clo+dx:chi+dx]]
+                    self.counts[k] += np.bincount(index.ravel(), minlength=Ng*Ng).reshape(Ng,Ng)
+                k += 1
+        return self
+
+    def merge(self, other):
+        '''
+        Add the counts of another accumulator of the same parameters.
+        '''
+        if self.counts.shape != other.counts.shape or self.symmetric != other.symmetric:
+            raise ValueError('Cannot merge accumulators of different parameters')
+        self.counts += other.counts
+        self.max_level = max(self.max_level, other.max_level)
+        return self
+
+    __iadd__ = merge
+
+    def matrices(self):
+        '''
+        Returns
+        -------
+        P : numpy ndarray
+            Co-occurrence matrices, as glcm_matrices of the whole image.
+        '''
+        Ng = self.max_level + 1 if self.max_level >= 0 else 1
+        P = self.counts[:,:Ng,:Ng]
+        if self.symmetric:
+            P = P + P.transpose(0,2,1)
+        return P
+
+    def features(self, ignore_zeros=True, compute_14th_feature=True):
+        '''
+        Returns
+        -------
+        features_mean, features_range, labels_mean, labels_range
+            As glcm_features of the whole image.
+        '''
+        labels_mean, labels_range = _labels(self.distances)
+        features = haralick_features(self.matrices(), ignore_zeros, compute_14th_feature)
+        features = features.reshape(-1, len(self.offsets), 14)
+        features_mean = features.mean(1).ravel()
+        features_range = np.ptp(features, 1).ravel()
+        return features_mean, features_range, labels_mean, labels_range
+
+def glcm_tiles(shape, tile_size=1024, halo=1):
+    '''
+    Parameters
+    ----------
+    shape : tuple
+        Image shape (N1, N2).
+    tile_size : int, optional
+        Size of tile cores. The default is 1024.
+    halo : int, optional
+        Halo of tiles, e.g. GLCMAccumulator.halo. The default is 1.
+
+    Yields
+    ------
+    rows, cols : slice
+        Pixels of the tile, including halo, in the image.
+    core : tuple
+        Core of the tile in tile coordinates, for GLCMAccumulator.add.
+    '''
+    N1, N2 = shape
+    for r in range(0, N1, tile_size):
+        for c in range(0, N2, tile_size):
+            rows = slice(max(r - halo, 0), min(r + tile_size + halo, N1))
+            cols = slice(max(c - halo, 0), min(c + tile_size + halo, N2))
+            core = (r - rows.start, min(r + tile_size, N1) - rows.start,
+                    c - cols.start, min(c + tile_size, N2) - cols.start)
+            yield rows, cols, core
+
+def glcm_features_tiled(f, mask=None, ignore_zeros=True, distances=1, offsets=OFFSETS,
+                        tile_size=1024, Ng=256, executor=None, compute_14th_feature=True):
+    '''
+    Parameters
+    ----------
+    f : numpy ndarray
+        Image of dimensions N1 x N2; any array read by slicing (e.g. a
+        numpy memmap), so only one tile per worker is in memory.
+    mask : numpy ndarray, optional
+        Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else. The
+        default is None (whole image).
+    ignore_zeros : int, optional
+        Ignore zeros in image f. The default is True.
+    distances : int or list, optional
+        Distance of pixel pairs, or list of distances. The default is 1.
+    offsets : list, optional
+        Unit offsets (row, column) of directions. The default is OFFSETS.
+    tile_size : int, optional
+        Size of tile cores. The default is 1024.
+    Ng : int, optional
+        Number of gray levels. The default is 256.
+    executor : concurrent.futures.Executor, optional
+        Executor to count the tiles on, e.g. a ThreadPoolExecutor. The 
+        default is None (sequential).
+    compute_14th_feature : bool, optional
+        Compute the maximal correlation coefficient. The default is True.
+
+    Returns
+    -------
+    features_mean, features_range, labels_mean, labels_range
+        As glcm_features of the whole image.
+    '''
+    halo = _halo(distances, offsets)
+    
+    def _tile(tile):
+        rows, cols, core = tile
+        accumulator = GLCMAccumulator(distances, offsets, Ng)
+        return accumulator.add(f[rows,cols], None if mask is None else mask[rows,cols], core)
+    
+    with stage('matrix'):
+        accumulator = GLCMAccumulator(distances, offsets, Ng)
+        tiles = glcm_tiles(np.shape(f), tile_size, halo)
+        # Partial counts are merged as they arrive, in tile order
+        partials = map(_tile, tiles) if executor is None else executor.map(_tile, tiles)
+        for partial in partials:
+            accumulator += partial
+    return accumulator.features(ignore_zeros, compute_14th_feature)
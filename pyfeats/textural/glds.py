@@ -9,6 +9,40 @@
 
 import numpy as np
 
+def _pairs(f, mask, dx, dy):
+    # Slice of pixels (x,y) whose pair (x+dx,y+dy) is inside the image, 
+    # |f(x,y) - f(x+dx,y+dy)| and whether both pixels are inside mask; 
+    # on the last two axes, so a stack of images K x N1 x N2 works as well
+    N1, N2 = f.shape[-2:]
+    x0, y0 = max(0,-dx), max(0,-dy)
+    x1, y1 = max(x0,min(N1,N1-dx)), max(y0,min(N2,N2-dy))
+    a = (Ellipsis, slice(x0,x1), slice(y0,y1))
+    b = (Ellipsis, slice(x0+dx,x1+dx), slice(y0+dy,y1+dy))
+    return a, np.abs(f[a] - f[b]), mask[a] & mask[b]
+
+def _bins(d, Ng, integral=False):
+    # Bin of each value as in np.histogram(d, bins=Ng, range=(0,Ng-1)), or 
+    # Ng if above range. Integer values below Ng-1 fall in their own bin.
+    if integral:
+        b = d.astype(np.intp)
+    else:
+        b = np.searchsorted(np.linspace(0, Ng-1, Ng+1), d, side='right') - 1
+    b[d == Ng-1] = Ng-1
+    b[d > Ng-1] = Ng
+    return b
+
+def _glds_features(p_d, Ng):
+    # Features of histograms p_d (... x Ng)
+    i = np.arange(Ng)
+    i2 = i ** 2
+    feats = np.zeros(p_d.shape[:-1] + (5,), np.double)
+    feats[...,0] = (p_d / (i2+1)).sum(-1)
+    feats[...,1] = (p_d * i2).sum(-1)
+    feats[...,2] = (p_d * p_d).sum(-1)
+    feats[...,3] = -(p_d * np.log(p_d+1e-16)).sum(-1)
+    feats[...,4] = (p_d * i).sum(-1)
+    return feats
+
 def glds(f, mask, dx, dy, Ng):
     '''
     Parameters
@@ -27,23 +61,21 @@ def glds(f, mask, dx, dy, Ng):
     Returns
     -------
     f_d : numpy ndarray
+        |f(x,y) - f(x+dx,y+dy)| where both pixels are inside mask, 0 else.
     p_d : numpy ndarray
+        Histogram of f_d over these pairs of pixels.
     '''
     
-    N1, N2 = f.shape
+    f = np.asarray(f, np.double)
+    mask = np.asarray(mask).astype(bool)
     
     # Calculate f_d(x,y). If calculation includes pixel outside mask, ignore it.
-    f_d = np.zeros((N1,N2), np.double) 
-    for x in range(N1):
-        for y in range(N2):
-            if (x+dx < N1) & (y+dy < N2) & (x+dx >= 0) & (y+dy >= 0) & (mask[x,y]==1):
-                f_d[x,y] = abs(f[x,y] - f[x+dx,y+dy])      
+    a, d, valid = _pairs(f, mask, dx, dy)
+    f_d = np.zeros(f.shape, np.double) 
+    f_d[a] = d * valid
             
     # Calculate pd_(i)
-    f_d_ravel = f_d.ravel()
-    mask_ravel = mask.ravel()
-    roi = f_d_ravel[mask_ravel.astype(bool)]
-    p_d = np.histogram(roi, bins=Ng, range=(0,Ng-1))[0] # histogram of f_d in ROI
+    p_d = np.bincount(_bins(d[valid], Ng), minlength=Ng+1)[:Ng]
         
     return f_d, p_d
      
@@ -78,33 +110,73 @@ def glds_features(f, mask, Dx=[0,1,1,1], Dy=[1,1,0,-1]):
                "GLDS_ASM","GLDS_Entopy","GLDS_Mean"]
     
     # 2) Parameters
-    f = f.astype(np.double)
-    mask = mask.astype(np.double)
+    f = f.astype(np.double, copy=False)
+    mask = mask.astype(bool, copy=False)
     Dx = np.array(Dx)
     Dy = np.array(Dy)
     Ng = 256    
+    integral = np.array_equal(f, np.floor(f))
     
-    # 3) Loop over Dx, Dy values to calculate feats
-    features = []  
+    # 3) Histogram of pairs inside mask of each Dx, Dy value 
+    p_d = np.zeros((Dx.shape[0],Ng), np.double)
     for ii in range(Dx.shape[0]):
+        _, d, valid = _pairs(f, mask, Dx[ii], Dy[ii])
+        p_d[ii] = np.bincount(_bins(d[valid], Ng, integral), minlength=Ng+1)[:Ng]
+      
+    # 4) Calculate Features: mean of feats
+    features = _glds_features(p_d, Ng).mean(axis=0)  
         
-        dx = Dx[ii]
-        dy = Dy[ii]  
+    return features, labels
+
+def glds_features_batch(f, mask, Dx=[0,1,1,1], Dy=[1,1,0,-1]):
+    '''
+    Parameters
+    ----------
+    f : numpy ndarray
+        Stack of K images of dimensions K x N1 x N2.
+    mask : numpy ndarray
+        Stack of K masks K x N1 x N2 with 1 if pixels belongs to ROI, 0 else.
+        Give None if you want to consider ROI the whole image.
+    Dx : int, optional
+        Array with X-coordinates of vectors denoting orientation. The default
+        is [0,1,1,1].
+    Dy : int, optional
+        Array with Y-coordinates of vectors denoting orientation. The default
+        is [1,1,0,-1].
         
-        f_d, p_d = glds(f, mask, dx, dy, Ng)
-            
-        feats = np.zeros(5,np.double)
-        i = np.arange(Ng)
-        i2 = i ** 2
-        feats[0] = sum(np.divide(p_d,i2+1))
-        feats[1] = sum(np.multiply(p_d, i2))
-        feats[2] = sum(np.multiply(p_d,p_d))
-        feats[3] = -sum(np.multiply(p_d,np.log(p_d+1e-16)))
-        feats[4] = sum(np.multiply(p_d,i))
-        features.append(feats) 
+    Returns
+    -------
+    features : numpy ndarray
+        Features of glds for each image (K x 5).
+    labels : list
+        Labels of features.
+    '''
+    
+    if mask is None:
+        mask = np.ones(f.shape)
+        
+    # 1) Labels
+    labels =  ["GLDS_Homogeneity","GLDS_Contrast",
+               "GLDS_ASM","GLDS_Entopy","GLDS_Mean"]
+    
+    # 2) Parameters
+    f = f.astype(np.double, copy=False)
+    mask = mask.astype(bool, copy=False)
+    Dx = np.array(Dx)
+    Dy = np.array(Dy)
+    Ng = 256
+    K = f.shape[0]
+    integral = np.array_equal(f, np.floor(f))
+    
+    # 3) Histogram of pairs inside mask of each Dx, Dy value; each is computed
+    # for all images at once
+    p_d = np.zeros((K,Dx.shape[0],Ng), np.double)
+    for ii in range(Dx.shape[0]):
+        _, d, valid = _pairs(f, mask, Dx[ii], Dy[ii])
+        b = _bins(d, Ng, integral) + (np.arange(K) * (Ng+1)).reshape(-1,1,1)
+        p_d[:,ii] = np.bincount(b[valid], minlength=K*(Ng+1)).reshape(K,Ng+1)[:,:Ng]
       
-    # 4) Calculate Features: mean of feats
-    features = np.array(features)
-    features = features.mean(axis=0)  
+    # 4) Calculate Features: mean over Dx, Dy
+    features = _glds_features(p_d, Ng).mean(axis=1)
         
-    return features, labels
\ No newline at end of file
+    return features, labels
@@ -10,158 +10,115 @@
 """
     
 import numpy as np
+from ..profiling import stage
+from ..cache import intermediate
+
+def _lines(f, degree):
+    # Lines of pixels of the given direction as rows of a 2D array, padded
+    # with the no-pixel value of f
+    N1, N2 = f.shape
+    if degree == 0:
+        return f
+    if degree == 90:
+        return f.T
+    y, x = np.indices(f.shape)
+    if degree == 45:
+        # Anti-diagonals (up-right), by x + y
+        line, pos = x + y, np.minimum(x, N1 - 1 - y)
+    else:
+        # Diagonals (down-right), by x - y
+        line, pos = x - y + N1 - 1, np.minimum(x, y)
+    lines = np.full((N1 + N2 - 1, min(N1, N2)), _none(f.dtype), f.dtype)
+    lines[line, pos] = f
+    return lines
+
+def _none(dtype):
+    # Value marking no pixel (outside mask or image): never equal to a gray
+    # level, so it breaks runs
+    return -1 if np.issubdtype(dtype, np.integer) else np.nan
+
+def _runs(f, mask, degree):
+    # Gray level and length of the runs of equal gray level along the lines
+    # of the given direction; a run breaks at the end of a line and at pixels
+    # outside the mask
+    f = np.asarray(f)
+    f = f.astype(np.int32 if np.issubdtype(f.dtype, np.integer) else np.double)
+    if mask is not None:
+        f[np.asarray(mask) == 0] = _none(f.dtype)
+    lines = _lines(f, degree)
+    # One no-pixel after each line ends the runs of the line
+    x = np.concatenate([lines, np.full((lines.shape[0],1), _none(f.dtype), f.dtype)], 1).ravel()
+    starts = np.flatnonzero(np.concatenate([[True], x[1:] != x[:-1]]))
+    lengths = np.diff(np.append(starts, x.size))
+    values = x[starts]
+    keep = values >= 0
+    return values[keep].astype(np.intp), lengths[keep]
+
+def _run_length_matrix(f, mask, degree, grayLevel, runLength):
+    # Scatter-add runs into the (gray level, run length - 1) matrix
+    values, lengths = _runs(f, mask, degree)
+    index = values * runLength + lengths - 1
+    return np.bincount(index, minlength=grayLevel*runLength)[:grayLevel*runLength]\
+        .reshape(grayLevel, runLength).astype(np.double)
 
 def glrlm_0(f, mask, grayLevel=5, runLength=5, skipFirstRow=True):
-    degree0Matrix = np.zeros([grayLevel, runLength])
-    counter = 0
-    for y in range(f.shape[0]):
-        for x in range(f.shape[1]):   
-            nowVal = f[y][x]
-            if x + 1 >= f.shape[1]:
-                nextVal = None
-            else:
-                nextVal = f[y][x + 1]
-            if nextVal != nowVal and counter == 0:
-                degree0Matrix[int(nowVal)][counter] += 1
-            elif nextVal == nowVal:
-                counter += 1
-            elif nextVal != nowVal and counter != 0:
-                degree0Matrix[int(nowVal)][counter] += 1
-                counter = 0
+    degree0Matrix = _run_length_matrix(f, mask, 0, grayLevel, runLength)
     return degree0Matrix[1:,:] if skipFirstRow else degree0Matrix
 
 def glrlm_90(f, mask, grayLevel=5, runLength=5, skipFirstRow=True):
-    degree90Matrix = np.zeros([grayLevel, runLength])
-    counter = 0
-    for x in range(f.shape[1]):
-        for y in range(f.shape[0]):
-            nowVal = f[y][x]
-            if y + 1 >= f.shape[0]:
-                nextVal = None
-            else:
-                nextVal = f[y + 1][x]
-            if nextVal != nowVal and counter == 0:
-                degree90Matrix[int(nowVal)][counter] += 1
-            elif nextVal == nowVal:
-                counter += 1
-            elif nextVal != nowVal and counter != 0:
-                degree90Matrix[int(nowVal)][counter] += 1
-                counter = 0
+    degree90Matrix = _run_length_matrix(f, mask, 90, grayLevel, runLength)
     return degree90Matrix[1:,:] if skipFirstRow else degree90Matrix
 
 def glrlm_45(f, mask, grayLevel=5, runLength=5, skipFirstRow=True):
-    degree45Matrix = np.zeros([grayLevel, runLength])
-    for y in range(f.shape[0]):
-        counter = 0
-        i_range = max(f.shape)
-        for i in range(i_range):
-            y1 = y - i
-            if i >= f.shape[1] or y1 < 0:
-                break
-            else:
-                nowVal = f[y1][i]
-            if y1 - 1 < 0 or i + 1 >= f.shape[1]:
-                nextVal = None
-            else:
-                nextVal = f[y1 - 1][i + 1]
-            if nextVal != nowVal and counter == 0:
-                degree45Matrix[int(nowVal)][counter] += 1
-            elif nextVal == nowVal:
-                counter += 1
-            elif nextVal != nowVal and counter != 0:
-                degree45Matrix[int(nowVal)][counter] += 1
-                counter = 0
-    for x in range(f.shape[1]):
-        if x == f.shape[1] - 1:
-            break
-        counter = 0
-        i_range = max(f.shape)
-        for i in range(i_range):
-            y_i = -1 - i
-            x_i = -1 + i - x
-            if x_i >= 0 or y_i <= -1 - f.shape[0]:
-                break
-            else:
-                nowVal = f[y_i][x_i]
-            if y_i - 1 <= -(f.shape[0] + 1) or x_i + 1 >= 0:
-                nextVal = None
-            else:
-                nextVal = f[y_i - 1][x_i + 1]
-            if nextVal != nowVal and counter == 0:
-                degree45Matrix[int(nowVal)][counter] += 1
-            elif nextVal == nowVal:
-                counter += 1
-            elif nextVal != nowVal and counter != 0:
-                degree45Matrix[int(nowVal)][counter] += 1
-                counter = 0
+    degree45Matrix = _run_length_matrix(f, mask, 45, grayLevel, runLength)
     degree45Matrix[0,1:] = 0
     return degree45Matrix[1:,:] if skipFirstRow else degree45Matrix
 
 def glrlm_135(f, mask, grayLevel=5, runLength=5, skipFirstRow=True):
-    degree135Matrix = np.zeros([grayLevel, runLength])
-    for y in range(f.shape[0]):
-        counter = 0
-        i_range = max(f.shape)
-        for i in range(i_range):
-            y1 = y + i
-            if y1 >= f.shape[0] or i >= f.shape[1]:
-                break
-            else:
-                nowVal = f[y1][i]
-                if y1 >= f.shape[0] - 1 or i >= f.shape[1] - 1:
-                    nextVal = None
-                else:
-                    nextVal = f[y1 + 1][i + 1]
-                if nextVal != nowVal and counter == 0:
-                    degree135Matrix[int(nowVal)][counter] += 1
-                elif nextVal == nowVal:
-                    counter += 1
-                elif nextVal != nowVal and counter != 0:
-                    degree135Matrix[int(nowVal)][counter] += 1
-                    counter = 0
-    for x in range(f.shape[1]):
-        if x == 0:
-            continue
-        i_range = max(f.shape)
-        counter = 0
-        for i in range(i_range):
-            x1 = x + i
-            if i >= f.shape[0] or x1 >= f.shape[1]:
-                break
-            else:
-                nowVal = f[i][x1]
-            if i >= f.shape[0] - 1 or x1 >= f.shape[1] - 1:
-                nextVal = None
-            else:
-                nextVal = f[i + 1][x1 + 1]
-            if nextVal != nowVal and counter == 0:
-                degree135Matrix[int(nowVal)][counter] += 1
-            elif nextVal == nowVal:
-                counter += 1
-            elif nextVal != nowVal and counter != 0:
-                degree135Matrix[int(nowVal)][counter] += 1
-                counter = 0
+    degree135Matrix = _run_length_matrix(f, mask, 135, grayLevel, runLength)
     degree135Matrix[0,1:] = 0
     return degree135Matrix[1:,:] if skipFirstRow else degree135Matrix
 
-def _apply_over_degree(function, x1, x2):
-    if function == np.divide:
-        x2 = x2 + 1e-16
-    rows, cols, nums = x1.shape
-    result = np.ndarray((rows, cols, nums))
-    for i in range(nums):
-        result[:, :, i] = function(x1[:, :, i], x2)
-        result[result == np.inf] = 0
-        result[np.isnan(result)] = 0
-    return result 
-    
-def _calculate_ij (rlmatrix):
-    gray_level, run_length, _ = rlmatrix.shape
-    I, J = np.ogrid[0:gray_level, 0:run_length]
-    return I, J+1
-    
-def _calculate_s(rlmatrix):
-    return np.apply_over_axes(np.sum, rlmatrix, axes=(0, 1))[0, 0]
+DEGREES = [0, 45, 90, 135]
+
+def glrlm_compact(f, mask, Ng=256):
+    '''
+    GLRL Matrices of glrlm, truncated to the gray levels present and to
+    the longest run.
+
+    Parameters
+    ----------
+    f : numpy ndarray
+        Image of dimensions N1 x N2.
+    mask : numpy ndarray
+        Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else.
+    Ng : int, optional
+        Image number of gray values. The default is 256.
+
+    Returns
+    -------
+    levels : numpy ndarray
+        Gray levels present (without 0, as in glrlm).
+    mat : numpy ndarray
+        Number of runs of each level and length (1 to the longest run)
+        for 0, 45, 90 and 135 degrees, len(levels) x max run x 4.
+    '''
+    runs = [_runs(f, mask, degree) for degree in DEGREES]
+    values = np.concatenate([v for v, _ in runs])
+    lengths = np.concatenate([l for _, l in runs])
+    direction = np.repeat(np.arange(4), [len(v) for v, _ in runs])
+    if values.size > 0 and values.max() >= Ng:
+        raise ValueError('Gray level ' + str(values.max()) + ' is not below Ng=' + str(Ng))
+    # Level 0 is skipped, as the first row in glrlm
+    keep = values > 0
+    values, lengths, direction = values[keep], lengths[keep], direction[keep]
+    present = np.bincount(values, minlength=Ng) > 0
+    levels = np.flatnonzero(present)
+    level = (np.cumsum(present) - 1)[values]
+    R = int(lengths.max()) if lengths.size > 0 else 1
+    index = (level * R + lengths - 1) * 4 + direction
+    mat = np.bincount(index, minlength=len(levels)*R*4).reshape(len(levels), R, 4)
+    return levels, mat.astype(np.double)
 
 def glrlm(f, mask, Ng=256):   
     '''
@@ -179,12 +136,9 @@ def glrlm(f, mask, Ng=256):
     mat : numpy ndarray
         GLRL Matrices for 0, 45, 90 and 135 degrees.
     '''
-    runLength = max(f.shape)
-    mat0 = glrlm_0(f, mask, grayLevel=Ng, runLength=runLength)
-    mat45 = glrlm_45(f, mask, grayLevel=Ng, runLength=runLength)
-    mat90 = glrlm_90(f, mask, grayLevel=Ng, runLength=runLength)
-    mat135 = glrlm_135(f, mask, grayLevel=Ng, runLength=runLength)            
-    mat = np.dstack((mat0, mat45, mat90, mat135))      
+    levels, compact = glrlm_compact(f, mask, Ng)
+    mat = np.zeros((Ng - 1, max(f.shape), 4))
+    mat[levels - 1, :compact.shape[1]] = compact
     return mat
 
 def glrlm_features(f, mask, Ng=256):
@@ -228,32 +182,39 @@ def glrlm_features(f, mask, Ng=256):
               "GLRLM_LongRunLowGrayLevelEmphasis",
               "GLRLM_LongRunHighGrayLevelEmphasis"]
     
-    rlmatrix = glrlm(f, mask, Ng)
-        
-    I, J = _calculate_ij(rlmatrix)
-    S = _calculate_s(rlmatrix)
-    G = np.apply_over_axes(np.sum, rlmatrix, axes=1)
-    R = np.apply_over_axes(np.sum, rlmatrix, axes=0)
-        
+    with stage('matrix'):
+        levels, rlmatrix = intermediate('glrlm_compact', lambda: glrlm_compact(f, mask, Ng),
+                                        f, mask, Ng)
+    
+    # Gray level index (level - 1) and run length of the compact matrix; the
+    # full matrix has Ng - 1 levels and runs up to max(f.shape)
+    I = (levels - 1).astype(np.double).reshape(-1,1)
+    J = np.arange(1, rlmatrix.shape[1] + 1, dtype=np.double).reshape(1,-1)
+    num_voxels = (Ng - 1) * max(f.shape)
+    
+    # All weighted sums of each direction in one pass; zero entries of the
+    # full matrix add nothing
+    eps = 1e-16
+    I2, J2 = I*I, J*J
+    weights = np.array(np.broadcast_arrays(1 / (J2 + eps), J2, 1 / (I2 + eps), I2, 
+                                           1 / (I2*J2 + eps), I2 / (J2 + eps),
+                                           J2 / (J2 + eps), I2*J2))
+    sums = np.einsum('wlr,lrd->wd', weights, rlmatrix)
+    S = rlmatrix.sum((0,1))
+    G = rlmatrix.sum(1)
+    R = rlmatrix.sum(0)
+    
     features = np.zeros(11,np.double)
-    features[0] = ((np.apply_over_axes(np.sum, _apply_over_degree(np.divide, rlmatrix, (J*J)), axes=(0, 1))[0, 0])/S).mean()
-    features[1] = ((np.apply_over_axes(np.sum, _apply_over_degree(np.multiply, rlmatrix, (J*J)), axes=(0, 1))[0, 0])/S).mean()
-    features[2] = ((np.apply_over_axes(np.sum, (G*G), axes=(0, 1))[0, 0])/S).mean()
-    features[3] = ((np.apply_over_axes(np.sum, (R*R), axes=(0, 1))[0, 0])/S).mean()
-        
-    gray_level, run_length,_ = rlmatrix.shape
-    num_voxels = gray_level * run_length
-    features[4] = (S/num_voxels).mean()
-        
-    features[5]= ((np.apply_over_axes(np.sum, _apply_over_degree(np.divide, rlmatrix, (I*I)), axes=(0, 1))[0, 0])/S).mean()
-    features[6] = ((np.apply_over_axes(np.sum, _apply_over_degree(np.multiply, rlmatrix, (I*I)), axes=(0, 1))[0, 0])/S).mean()
-    features[7] = ((np.apply_over_axes(np.sum, _apply_over_degree(np.divide, rlmatrix, (I*I*J*J)), axes=(0, 1))[0, 0])/S).mean()
-        
-    temp = _apply_over_degree(np.multiply, rlmatrix, (I*I))
-    features[8] = ((np.apply_over_axes(np.sum, _apply_over_degree(np.divide, temp, (J*J)), axes=(0, 1))[0, 0])/S).mean()
-        
-    temp = _apply_over_degree(np.multiply, rlmatrix, (J*J))
-    features[9] = ((np.apply_over_axes(np.sum, _apply_over_degree(np.divide, temp, (J*J)), axes=(0, 1))[0, 0])/S).mean()
-    features[10] = ((np.apply_over_axes(np.sum, _apply_over_degree(np.multiply, rlmatrix, (I*I*J*J)), axes=(0, 1))[0, 0])/S).mean()
+    features[0] = (sums[0] / S).mean()
+    features[1] = (sums[1] / S).mean()
+    features[2] = ((G*G).sum(0) / S).mean()
+    features[3] = ((R*R).sum(0) / S).mean()
+    features[4] = (S / num_voxels).mean()
+    features[5] = (sums[2] / S).mean()
+    features[6] = (sums[3] / S).mean()
+    features[7] = (sums[4] / S).mean()
+    features[8] = (sums[5] / S).mean()
+    features[9] = (sums[6] / S).mean()
+    features[10] = (sums[7] / S).mean()
         
-    return features, labels    
\ No newline at end of file
+    return features, labels
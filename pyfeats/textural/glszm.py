@@ -14,8 +14,66 @@ ps = ps[ps!=0]) and as a result jvector changes outputs.
 
 import numpy as np
 from skimage import measure
+from ..profiling import stage
+from ..cache import intermediate
 import warnings
 
+def _connectivity(f, connectivity):
+    if connectivity == None:
+        pass
+    elif connectivity > f.ndim:
+        connectivity = f.ndim
+        warnings.warn('Accepted values for connectivity are ranging from 1 to f.ndim. Changed to f.ndim')
+    elif connectivity < 1:
+        connectivity = 1
+        warnings.warn('Accepted values for connectivity are ranging from 1 to f.ndim. Changed to 1')
+    return connectivity
+
+def glszm_triplets(f, mask, connectivity=1):
+    '''
+    GLSZ Matrix as a list of its nonzero entries, so memory grows with the
+    number of distinct (gray level, zone size) pairs.
+
+    Parameters
+    ----------
+    f : numpy ndarray
+        Image of dimensions N1 x N2.
+    mask : numpy ndarray
+        Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else. Give None
+        if you want to consider ROI the whole image.
+    connectivity: int, optional
+        Maximum number of orthogonal hops to consider a pixel as a neighbor
+        of a zone. The default is 1.
+
+    Returns
+    -------
+    levels : numpy ndarray
+        Gray level of each entry (row of glszm).
+    sizes : numpy ndarray
+        Zone size of each entry (column of glszm).
+    counts : numpy ndarray
+        Number of zones of each entry.
+    '''
+    connectivity = _connectivity(f, connectivity)
+    if mask is None:
+        mask = np.ones(f.shape)
+    
+    # All zones at once: connected pixels of equal gray level inside the mask
+    # (gray levels shifted by one, so that 0 is the background outside it)
+    f = f.astype(np.intp)
+    zones = measure.label(np.where(mask != 0, f + 1, 0), background=0, 
+                          connectivity=connectivity)
+    zone_size = np.bincount(zones.ravel())
+    zone_level = np.zeros(zone_size.shape, np.intp)
+    zone_level[zones.ravel()] = f.ravel()
+    zone_size, zone_level = zone_size[1:], zone_level[1:]
+    
+    # Distinct (level, size) pairs and their number of zones
+    Ns = f.shape[0] * f.shape[1] + 1
+    codes, counts = np.unique(zone_level * Ns + zone_size, return_counts=True)
+    levels, sizes = np.divmod(codes, Ns)
+    return levels, sizes, counts
+
 def glszm(f, mask, connectivity=1):
     '''
     Parameters
@@ -32,37 +90,18 @@ def glszm(f, mask, connectivity=1):
     Returns
     -------
     GLSZM : numpy ndarray
-        GLSZ Matrix.
+        GLSZ Matrix: number of zones (connected pixels of equal gray level
+        inside the mask) of each gray level and size. Dense, Ng x (N1*N2+1);
+        see glszm_triplets for large images.
     '''
-    if connectivity == None:
-        pass
-    elif connectivity > f.ndim:
-        connectivity = f.ndim
-        warnings.warn('Accepted values for connectivity are ranging from 1 to f.ndim. Changed to f.ndim')
-    elif connectivity < 1:
-        connectivity = 1
-        warnings.warn('Accepted values for connectivity are ranging from 1 to f.ndim. Changed to 1')
-    
     Ng = 256
-    levels=np.arange(0,Ng)
-
     Ns = f.shape[0] * f.shape[1] + 1
-    GLSZM = np.zeros((Ng-1,Ns), np.double)
-    
-    temp = f.copy()
-    for i in range(Ng-1):
-        temp[f!=levels[i]] = 0
-        temp[f==levels[i]] = 1
-        connected_components = measure.label(temp, connectivity=connectivity)
-        connected_components = connected_components * mask
-        nZone = len(np.unique(connected_components))
-        for j in range(nZone):
-            col = np.count_nonzero(connected_components==j)
-            GLSZM[i,col] += 1
-            
+    levels, sizes, counts = glszm_triplets(f, mask, connectivity)
+    GLSZM = np.zeros((Ng,Ns), np.double)
+    GLSZM[levels, sizes] = counts
     return GLSZM
             
-def glszm_features(f, mask):
+def glszm_features(f, mask, connectivity=1):
     '''
     Parameters
     ----------
@@ -70,6 +109,9 @@ def glszm_features(f, mask):
         Image of dimensions N1 x N2.
     mask : numpy ndarray
         Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else.
+    connectivity: int, optional
+        Maximum number of orthogonal hops to consider a pixel as a neighbor
+        of a zone. The default is 1.
 
     Returns
     -------
@@ -97,41 +139,41 @@ def glszm_features(f, mask):
               'GLSZM_LargeZoneHighGrayLevelEmphasis', 'GLSZM_GrayLevelVariance',
               'GLSZM_ZoneSizeVariance','GLSZM_ZoneSizeEntropy']
     
-    P = glszm(f, mask)
-    # FIXME
-    #idx = np.argwhere(np.all(P[..., :] == 0, axis=0))
-    #P = np.delete(P, idx, axis=1)
+    with stage('matrix'):
+        levels, sizes, counts = intermediate('glszm_triplets', 
+            lambda: glszm_triplets(f, mask, connectivity), f, mask, connectivity)
     
-    p = P / P.sum()
-
-    Ng, Ns = p.shape
-    pg = np.sum(p,1) # Gray-Level Sum [Ng x 1]
-    ps = np.sum(p,0) # Zone-Size Sum  [Ns x 1]
-    jvector = np.arange(1,Ns+1) 
-    ivector = np.arange(1,Ng+1)     
-    Nz = np.sum(P, (0,1))
-    Np = np.sum(ps * jvector, 0)
-    [imat,jmat] = np.meshgrid(jvector,ivector)
+    # Features of the dense Ng x Ns matrix from its nonzero entries only: i is
+    # the gray level and j the zone size, both counted from 1 as columns and
+    # rows of the dense matrix
+    Ng, Ns = 256, f.shape[0] * f.shape[1] + 1
+    p = counts / counts.sum()
+    i = levels + 1.
+    j = sizes + 1.
+    pg = np.bincount(levels, p) # Gray-Level Sum
+    ps = np.bincount(np.unique(sizes, return_inverse=True)[1].ravel(), p) # Zone-Size Sum
+    Nz = counts.sum()
+    Np = np.dot(p, j)
         
     features = np.zeros(14, np.double)
-    features[0] = np.dot(ps,((1/(jvector+1e-16))**2))
-    features[1]= np.dot(ps, jvector ** 2) 
+    features[0] = np.dot(p, (1/(j+1e-16))**2)
+    features[1] = np.dot(p, j**2)
     features[2] = (pg**2).sum()
     features[3] = (ps**2).sum()
     features[4] = Nz / Np
-    features[5] = np.dot(pg, 1/(ivector+1e-16)**2) 
-    features[6] = np.dot(pg, ivector ** 2)
-    features[7] =  np.multiply(p, 
-                    np.multiply(1/(jmat+1e-16)**2,1/(imat+1e-16)**2)).sum()
-    features[8] = np.multiply(p, 
-                    np.multiply(jmat**2,1/(imat+1e-16)**2)).sum()
-    features[9] = np.multiply(p, 
-                    np.multiply(1/(jmat+1e-16)**2,imat**2)).sum()
-    features[10] = np.multiply(p, np.multiply(jmat**2,imat**2)).sum()
-    meang = np.dot(pg,ivector)/(Ng*Ns) 
-    features[11] = ((np.multiply(p, jmat) - meang) ** 2).sum() / (Ng*Ns)
-    means = np.dot(ps,jvector)/(Ng*Ns)
-    features[12] = ((np.multiply(p, imat) - means) ** 2).sum() / (Ng*Ns)
-    features[13] = np.multiply(p, np.log2(p+1e-16)).sum()
+    features[5] = np.dot(p, 1/(i+1e-16)**2)
+    features[6] = np.dot(p, i**2)
+    features[7] = np.dot(p, (1/(i+1e-16)**2) * (1/(j+1e-16)**2))
+    features[8] = np.dot(p, i**2 * (1/(j+1e-16)**2))
+    features[9] = np.dot(p, (1/(i+1e-16)**2) * j**2)
+    features[10] = np.dot(p, i**2 * j**2)
+    # Variances over all Ng x Ns entries, of which the zero ones add the
+    # squared mean each
+    n_zero = Ng * Ns - len(p)
+    meang = np.dot(p, i)/(Ng*Ns)
+    features[11] = (((p * i - meang) ** 2).sum() + n_zero * meang**2) / (Ng*Ns)
+    means = np.dot(p, j)/(Ng*Ns)
+    features[12] = (((p * j - means) ** 2).sum() + n_zero * means**2) / (Ng*Ns)
+    features[13] = np.dot(p, np.log2(p+1e-16))
 
-    return features, labels
\ No newline at end of file
+    return features, labels
@@ -12,7 +12,6 @@
 
 import numpy as np
 from skimage.transform import radon
-import matplotlib.pyplot as plt
 import warnings
 from .bispectrum import _bispectrum  
 
@@ -55,6 +54,7 @@ def hos_features(f, th=[135,140]):
     return np.array(entropy).reshape(-1), labels
 
 def plot_sinogram(f, name=''):
+    import matplotlib.pyplot as plt
     if name != '':
         name = '('+name+')'
     warnings.filterwarnings("ignore")
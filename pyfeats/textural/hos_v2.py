@@ -12,9 +12,9 @@
 
 from scipy import ndimage
 import numpy as np
-import matplotlib.pyplot as plt
 import math
 from .bispectrum import _bispectrum
+from ..profiling import stage
 
 
 def _pad_image_2(f):
@@ -86,13 +86,15 @@ def hos_features(f, th=[135,140]):
     '''
         
     f = f.astype(np.float32)   
-    radon_transform = discrete_radon_transform(f, th, remove_zeros=True)
+    with stage('radon'):
+        radon_transform = discrete_radon_transform(f, th, remove_zeros=True)
     
     labels = ['HOS_'+str(th)+'_degrees' for th in th]
     
     entropy = []
     for i in range(len(th)):
-        B, _ = _bispectrum(radon_transform[:,i])
+        with stage('bispectrum'):
+            B, _ = _bispectrum(radon_transform[:,i])
         p = abs(B) / abs(B).sum()
         e = _entropy(p)
         entropy.append(e)
@@ -101,6 +103,7 @@ def hos_features(f, th=[135,140]):
 
 
 def plot_sinogram(f, name=''):
+    import matplotlib.pyplot as plt
     if name != '':
         name = '('+name+')'
     theta = [i for i in range(180)]
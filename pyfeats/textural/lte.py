@@ -10,11 +10,93 @@
 """
 
 import numpy as np
-from scipy import signal
-from ..utilities import _image_xor
+from ..utilities import _image_xor, _map
+from ..profiling import stage
 import warnings
 
-def lte_measures(f, mask, l=7):
+def _laws_vectors(l):
+    # 1-D Law's vectors [L, E, S] of size l
+    if l==3:
+        L = np.array([ 1,  2,  1], np.double)
+        E = np.array([-1,  0,  1], np.double)
+        S = np.array([-1,  2, -1], np.double)
+    elif l==5:
+        L = np.array([ 1,  4,  6,  4,  1], np.double)
+        E = np.array([-1, -2,  0,  2,  1], np.double)
+        S = np.array([-1,  0,  2,  0, -1], np.double)
+    elif l==7:
+        L = np.array([ 1,  6,  15,  20,  15,  6,  1], np.double)
+        E = np.array([-1, -4,  -5,   0,   5,  4,  1], np.double)
+        S = np.array([-1, -2,   1,   4,   1, -2, -1], np.double)
+    return [L, E, S]
+
+def _sizes(l):
+    # List of accepted Law's mask sizes
+    sizes = []
+    for size in np.atleast_1d(l):
+        if size not in [3,5,7]:
+            warnings.warn('Accepted vsize for Laws mask are 3, 5 and 7. Using 7 by default')
+            size = 7
+        sizes.append(int(size))
+    return sizes
+
+def _convolve(f, v, axis):
+    # 'valid' 1-D convolution of f with v along axis (-2: rows, -1: columns)
+    l = v.shape[0]
+    n = f.shape[axis] - l + 1
+    out = 0
+    for k in range(l):
+        index = [slice(None)] * f.ndim
+        index[axis] = slice(k, k+n)
+        out = out + v[l-1-k] * f[tuple(index)]
+    return out
+
+def _lte_energy(f, mask_c, sizes, executor=None):
+    '''
+    Energy of the 9 Law's kernels [LL, LE, LS, EL, EE, ES, SL, SE, SS] of each 
+    size, for an image N1 x N2 or a stack of images K x N1 x N2 (... x 9 each).
+    Each kernel v1 x v2 is separable: the image is filtered along rows with 
+    L, E and S once, and each kernel takes one more 1-D pass along columns.
+    '''
+    
+    # Summed-area table of pixels outside ROI, shared by all sizes
+    mask_c = (np.asarray(mask_c) != 0).astype(np.double)
+    sat = np.zeros(mask_c.shape[:-2] + (mask_c.shape[-2]+1, mask_c.shape[-1]+1), np.double)
+    sat[...,1:,1:] = mask_c.cumsum(-2).cumsum(-1)
+    
+    energies = []
+    for l in sizes:
+        vectors = _laws_vectors(l)
+        
+        # Get mask where convolution should be performed: windows of size 
+        # l x l that lie completely inside the ROI
+        outside = sat[...,l:,l:] - sat[...,:-l,l:] - sat[...,l:,:-l] + sat[...,:-l,:-l]
+        mask_conv = (outside == 0).astype(np.double)
+        area = mask_conv.sum(axis=(-2,-1))
+        
+        # Calculate energy of each convolved image with each kernel: total 9
+        rows = [_convolve(f, v, -1) for v in vectors]
+        def _energy(i):
+            f_conv = _convolve(rows[i%3], vectors[i//3], -2)
+            f_conv = np.multiply(f_conv,mask_conv)
+            f_conv_mean = f_conv.sum(axis=(-2,-1)) / area
+            f_conv_var = np.multiply((f_conv-f_conv_mean[...,np.newaxis,np.newaxis])**2,mask_conv)
+            return np.sqrt(f_conv_var.sum(axis=(-2,-1))/area)
+        energies.append(np.stack(_map(_energy, range(9), executor), axis=-1))
+    return energies
+
+def _lte_features(energy):
+    # 6 features from the energy of 9 kernels (... x 9)
+    features = np.zeros(energy.shape[:-1] + (6,),np.double) 
+    features[...,0] = energy[...,0]
+    features[...,1] = energy[...,4]
+    features[...,2] = energy[...,8]
+    features[...,3] = (energy[...,1]+energy[...,3])/2
+    features[...,4] = (energy[...,5]+energy[...,7])/2
+    features[...,5] = (energy[...,2]+energy[...,6])/2
+    return features
+
+def lte_measures(f, mask, l=7, executor=None, mask_c=None):
     '''
     Parameters
     ----------
@@ -23,8 +105,14 @@ def lte_measures(f, mask, l=7):
     mask : numpy ndarray
         Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else. Give None
         if you want to consider ROI the whole image.
-    l : int, optional
-        Law's mask size. The default is 7.
+    l : int or list, optional
+        Law's mask size, or list of sizes (e.g. [3,5,7]). The default is 7.
+    executor : concurrent.futures.Executor, optional
+        Executor to run the 9 convolutions on, e.g. a ThreadPoolExecutor. 
+        The default is None (sequential).
+    mask_c : numpy ndarray, optional
+        Complementary mask (1 outside ROI, 0 inside) if already computed, 
+        e.g. by FeatureExtractor. The default is None (computed from mask).
 
     Returns
     -------
@@ -33,7 +121,8 @@ def lte_measures(f, mask, l=7):
         kernel, 3)texture energy from SS kernel, 4)average texture 
         energy from LE and EL kernels, 5)average texture energy from 
         ES and SE kernels, 6)average texture energy from LS and SL 
-        kernels.
+        kernels. For a list of sizes, the features of each size are
+        concatenated.
     labels : list
         Labels of features.
     '''
@@ -43,65 +132,60 @@ def lte_measures(f, mask, l=7):
         
     # 1) Labels
     labels = ["LTE_LL","LTE_EE","LTE_SS","LTE_LE","LTE_ES","LTE_LS"]
-    labels = [label+'_'+str(l) for label in labels]
+    labels = [label+'_'+str(size) for size in np.atleast_1d(l) for label in labels]
     
     # 2) Parameters
-    f = np.array(f, np.double)
-    mask = np.array(mask, np.double) 
-    kernels = np.zeros((l,l,9), np.double)
+    f = np.asarray(f, np.double)
+    mask = np.asarray(mask, np.double) 
+    if mask_c is None:
+        mask_c = _image_xor(mask)
     
-    # 3) From 3 kernels [L, E, S], get 9 [LL, LE, LS, EL, EE, ES, SL, SE, SS]
-    if l not in [3,5,7]:
-        warnings.warn('Accepted vsize for Laws mask are 3, 5 and 7. Using 7 by default')
-        l = 7
-    if l==3:
-        L = np.array([ 1,  2,  1], np.double)
-        E = np.array([-1,  0,  1], np.double)
-        S = np.array([-1,  2, -1], np.double)
-    elif l==5:
-        L = np.array([ 1,  4,  6,  4,  1], np.double)
-        E = np.array([-1, -2,  0,  2,  1], np.double)
-        S = np.array([-1,  0,  2,  0, -1], np.double)
-    elif l==7:
-        L = np.array([ 1,  6,  15,  20,  15,  6,  1], np.double)
-        E = np.array([-1, -4,  -5,   0,   5,  4,  1], np.double)
-        S = np.array([-1, -2,   1,   4,   1, -2, -1], np.double)
-        
-    oneskernel = np.ones((l,l), np.double)    
-    kernels = np.zeros((l,l,9), np.double)
-    kernels[:,:,0] = np.multiply(L.reshape(-1,1),L) # LL kernel
-    kernels[:,:,1] = np.multiply(L.reshape(-1,1),E) # LE kernel
-    kernels[:,:,2] = np.multiply(L.reshape(-1,1),S) # LS kernel
-    kernels[:,:,3] = np.multiply(E.reshape(-1,1),L) # EL kernel
-    kernels[:,:,4] = np.multiply(E.reshape(-1,1),E) # EE kernel
-    kernels[:,:,5] = np.multiply(E.reshape(-1,1),S) # ES kernel
-    kernels[:,:,6] = np.multiply(S.reshape(-1,1),L) # SL kernel
-    kernels[:,:,7] = np.multiply(S.reshape(-1,1),E) # SE kernel
-    kernels[:,:,8] = np.multiply(S.reshape(-1,1),S) # SS kernel
-    
-    # 4) Get mask where convolution should be performed
-    mask_c = _image_xor(mask)
-    mask_conv = signal.convolve2d(mask_c, oneskernel,'valid')
-    mask_conv = np.abs(np.sign(mask_conv)-1)
-        
-    # 5) Calculate energy of each convolved image with each kernel: total 9
-    energy = np.zeros(9,np.double)   
-    area = sum(sum(mask_conv))          
-    for i in range(9):
-        f_conv = signal.convolve2d(f, kernels[:,:,i], mode='valid')
-        f_conv = np.multiply(f_conv,mask_conv)     
-        f_conv_mean = sum(sum(f_conv)) / area
-        energy[i] = np.sqrt(sum(sum(np.multiply((f_conv-f_conv_mean)**2,mask_conv)))/area)
+    # 3) Calculate energy of each convolved image with each kernel: total 9
+    # for each size
+    with stage('filtering'):
+        energy = _lte_energy(f, mask_c, _sizes(l), executor)
            
-    # 6) Calculate features
-    features = np.zeros(6,np.double) 
-    features[0] = energy[0]
-    features[1] = energy[4]
-    features[2] = energy[8]
-    features[3] = (energy[1]+energy[3])/2
-    features[4] = (energy[5]+energy[7])/2
-    features[5] = (energy[2]+energy[6])/2
+    # 4) Calculate features
+    features = np.concatenate([_lte_features(e) for e in energy])
         
     return features, labels
 
+def lte_measures_batch(f, mask, l=7):
+    '''
+    Parameters
+    ----------
+    f : numpy ndarray
+        Stack of K images of dimensions K x N1 x N2.
+    mask : numpy ndarray
+        Stack of K masks K x N1 x N2 with 1 if pixels belongs to ROI, 0 else.
+        Give None if you want to consider ROI the whole image.
+    l : int or list, optional
+        Law's mask size, or list of sizes. The default is 7.
+
+    Returns
+    -------
+    features : numpy ndarray
+        Features of lte_measures for each image (K x 6 for each size).
+    labels : list
+        Labels of features.
+    '''
 
+    if mask is None:
+        mask = np.ones(f.shape)
+        
+    # 1) Labels
+    labels = ["LTE_LL","LTE_EE","LTE_SS","LTE_LE","LTE_ES","LTE_LS"]
+    labels = [label+'_'+str(size) for size in np.atleast_1d(l) for label in labels]
+    
+    # 2) Parameters
+    f = np.asarray(f, np.double)
+    mask = np.asarray(mask, np.double) 
+    
+    # 3) Calculate energy of each convolved image with each kernel: total 9
+    # for each size
+    energy = _lte_energy(f, _image_xor(mask), _sizes(l))
+           
+    # 4) Calculate features
+    features = np.concatenate([_lte_features(e) for e in energy], axis=1)
+        
+    return features, labels
@@ -8,8 +8,18 @@
 ==============================================================================
 """
 import numpy as np
-from scipy import signal
-from ..utilities import _image_xor
+from ..profiling import stage
+
+def _sat(a):
+    # Summed-area table with a zero first row and column
+    sat = np.zeros((a.shape[0]+1, a.shape[1]+1), np.double)
+    sat[1:,1:] = a.cumsum(0).cumsum(1)
+    return sat
+
+def _box(sat, d):
+    # Sums over the (2d+1) x (2d+1) windows centered at pixels d:N1-d, d:N2-d
+    k = 2*d + 1
+    return sat[k:,k:] - sat[:-k,k:] - sat[k:,:-k] + sat[:-k,:-k]
 
 def ngtdm(f, mask, d, Ng=256):
     '''
@@ -19,8 +29,8 @@ def ngtdm(f, mask, d, Ng=256):
         Image of dimensions N1 x N2.
     mask : numpy ndarray
         Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else.
-    d : int, optional
-        Distance for NGTDM. Default is 1.
+    d : int or list, optional
+        Distance for NGTDM, or list of distances. Default is 1.
     Ng : int, optional
         Image number of gray values. The default is 256.
 
@@ -29,41 +39,67 @@ def ngtdm(f, mask, d, Ng=256):
     S : numpy ndarray
     N : numpy ndarray
     R : numpy ndarray
+        For a list of distances, S and N are len(d) x Ng and R has len(d)
+        values.
     '''
     
     f = f.astype(np.double)
     N1, N2 = f.shape
-    oneskernel = np.ones((2*d+1,2*d+1))
-    kernel = oneskernel.copy()
-    kernel[d,d] = 0
-    W = (2*d + 1)**2 
     
-    # Get complementary mask     
-    mask_c = _image_xor(mask)
+    # Summed-area tables of the image and of the mask give the sums over the
+    # neighbourhood of every pixel, for any d
+    inside = mask.astype(np.uint8, copy=False) == 1
+    if inside.any() and f[inside].max() >= Ng:
+        raise ValueError('Gray level ' + str(int(f[inside].max())) + ' is not below Ng=' + str(Ng))
+    sat_f = _sat(f)
+    sat_mask = _sat(inside)
     
-    # Find which pixels are inside mask for convolution
-    conv_mask = signal.convolve2d(mask_c,oneskernel,'same')
-    conv_mask = abs(np.sign(conv_mask)-1)
+    distances = np.atleast_1d(d)
+    S = np.zeros((len(distances),Ng), np.double)
+    N = np.zeros((len(distances),Ng), np.double)
+    for k, dk in enumerate(distances):
+        dk = int(dk)
+        if N1 <= 2*dk or N2 <= 2*dk:
+            continue
+        W = (2*dk + 1)**2
+        center = f[dk:N1-dk,dk:N2-dk]
+        
+        # Pixels whose whole neighbourhood is inside mask
+        valid = _box(sat_mask, dk) == W
         
-    # Calculate abs diff between actual and neighborhood
-    A = signal.convolve2d(f,kernel,'same') / (W-1)
-    diff = abs(f-A)
-         
-    # Construct NGTDM matrix
-    S = np.zeros(Ng,np.double)
-    N = np.zeros(Ng,np.double)
-    for x in range(d,(N1-d)):
-        for y in range(d,(N2-d)):
-        	if conv_mask[x,y] > 0:
-        		index = f[x,y].astype('i')
-        		S[index] = S[index] + diff[x,y]
-        		N[index] += 1
-            
-    R = sum(N)
+        # Calculate abs diff between actual and neighborhood
+        A = (_box(sat_f, dk) - center) / (W-1)
+        diff = abs(center-A)
+        
+        # Construct NGTDM matrix
+        index = center[valid].astype('i')
+        S[k] = np.bincount(index, diff[valid], minlength=Ng)[:Ng]
+        N[k] = np.bincount(index, minlength=Ng)[:Ng]
+    R = N.sum(1)
     
+    if np.ndim(d) == 0:
+        return S[0], N[0], R[0]
     return S, N, R
 
-def ngtdm_features(f, mask, d=1):
+def _ngtdm_features(S, N, R, Ng):
+    # Pairs of gray levels contribute only if both are present (N > 0), so
+    # all sums run over the G present levels (G x G pairs)
+    present = np.flatnonzero(N)
+    n, s = N[present], S[present]
+    i = present.astype(np.double)
+    ilessj = np.abs(i.reshape(-1,1) - i)
+    ilessjsq = ilessj**2
+    ni, nj = n.reshape(-1,1), n
+    
+    features = np.zeros(5,np.double) 
+    features[0] = R*R / np.dot(n, s)
+    features[1] = S.sum() * (ni * nj * ilessjsq).sum() / R**3 / Ng / (Ng-1)
+    features[2] = np.dot(n, s) / np.abs((i * n).reshape(-1,1) - i * n).sum() / R
+    features[3] = (ilessj * ((n*s).reshape(-1,1) + n*s) / (ni + nj + 1e-16)).sum() / R
+    features[4] = ((ni + nj) * ilessjsq).sum() / (S.sum() + 1e-16)
+    return features
+
+def ngtdm_features(f, mask, d=1, Ng=256):
     '''  
     Parameters
     ----------
@@ -72,13 +108,18 @@ def ngtdm_features(f, mask, d=1):
     mask : numpy ndarray
         Mask image N1 x N2 with 1 if pixels belongs to ROI, 0 else. Give None
         if you want to consider ROI the whole image.
-    d : int, optional
-        Distance for NGTDM. Default is 1.
+    d : int or list, optional
+        Distance for NGTDM, or list of distances computed in one call. 
+        Default is 1.
+    Ng : int, optional
+        Image number of gray values. With 256 (the default) the image is cast
+        to uint8, else it must have integer gray levels 0 to Ng-1.
 
     Returns
     -------
     features : numpy ndarray
-        1)Coarseness, 2)Contrast, 3)Busyness, 4)Complexity, 5)Strength.
+        1)Coarseness, 2)Contrast, 3)Busyness, 4)Complexity, 5)Strength. For a
+        list of distances, the features of each distance one after the other.
     labels : list
         Labels of features.
     '''
@@ -89,31 +130,18 @@ def ngtdm_features(f, mask, d=1):
     # 1) Labels
     labels = ["NGTDM_Coarseness","NGTDM_Contrast","NGTDM_Busyness",
               "NGTDM_Complexity","NGTDM_Strngth"]
+    if np.ndim(d) > 0:
+        labels = [label + "_d" + str(dk) for dk in d for label in labels]
     
     # 2) Parameters
-    f  = f.astype(np.uint8)
-    mask = mask.astype(np.uint8)
-    Ng = 256
+    f  = f.astype(np.uint8 if Ng == 256 else np.intp, copy=False)
+    mask = mask.astype(np.uint8, copy=False)
     
-    # 3) Calculate NGTDM
-    S, N, R = ngtdm(f, mask, d, Ng)
+    # 3) Calculate NGTDM of all distances from one set of summed-area tables
+    with stage('matrix'):
+        S, N, R = ngtdm(f, mask, np.atleast_1d(d), Ng)
         
     # 4) Calculate Features
-    features = np.zeros(5,np.double) 
-    Ni, Nj = np.meshgrid(N,N)
-    Si, Sj = np.meshgrid(S,S)
-    i, j = np.meshgrid(np.arange(Ng),np.arange(Ng))
-    ilessjsq = ((i-j)**2).astype(np.double)   
-    Ni = np.multiply(Ni,abs(np.sign(Nj)))
-    Nj = np.multiply(Nj,abs(np.sign(Ni)))     
-    features[0] = R*R / sum(np.multiply(N,S))
-    features[1] = sum(S)*sum(sum(np.multiply(np.multiply(Ni,Nj),ilessjsq)))/R**3/Ng/(Ng-1)
-    temp = np.multiply(i,Ni) - np.multiply(j,Nj)
-    features[2] = sum(np.multiply(N,S)) / sum(sum(abs(temp))) / R
-    temp = np.multiply(Ni,Si) + np.multiply(Nj,Sj)
-    temp2 = np.multiply(abs(i-j),temp)
-    temp3 = np.divide(temp2,Ni+Nj+1e-16)
-    features[3] = sum(sum(temp3)) / R
-    features[4] = sum(sum(np.multiply(Ni+Nj,ilessjsq))) / (sum(S)+1e-16)
+    features = np.concatenate([_ngtdm_features(S[k], N[k], R[k], Ng) for k in range(len(R))])
         
-    return features, labels
\ No newline at end of file
+    return features, labels
@@ -7,6 +7,20 @@
 ==============================================================================
 """
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft
+
+def _correlate(arrays, pairs, Lr, Lc):
+    '''
+    Correlations sum_x a[x] * b[x + (drow,dcol)] of the given pairs of
+    arrays for drow = 0..Lr and dcol = -Lc..Lc, via FFT of zero-padded arrays.
+    '''
+    N1, N2 = arrays[0].shape
+    shape = (fft.next_fast_len(N1+Lr, True), fft.next_fast_len(N2+Lc, True))
+    F = fft.rfft2(np.array(arrays), shape)
+    C = np.array([F[i].conj() * F[j] for i, j in pairs])
+    C = fft.irfft2(C, shape)
+    return C[:, :Lr+1, np.arange(-Lc,Lc+1) % shape[1]]
 
 def con_cov_dss(f, mask, Lr=4, Lc=4, Ng=256):
     '''
@@ -30,39 +44,48 @@ def con_cov_dss(f, mask, Lr=4, Lc=4, Ng=256):
     DSS : numpy ndarray
     '''
     
+    f = np.asarray(f, np.double)
+    mask = np.asarray(mask, np.double)
     N1, N2 = f.shape
     CON = np.zeros((Lr+1,2*Lc+1),np.double) # delta contrast
     COV = np.zeros((Lr+1,2*Lc+1),np.double) # deltra covariance
     DSS = np.zeros((Lr+1,2*Lc+1),np.double) # delta dissimilarity
-        
-    for drow in range(Lr+1):
-        for dcol in range(-Lc,Lc+1):
-                
-            # Define coords in statistical feature matrix
-            row = drow
-            col = dcol + Lc
-                
-            # Shift image by drow, dcol := f_d
-            f_d = np.ones((N1,N2),np.double) * (Ng - 1)
-            mask_d = np.zeros((N1,N2),np.double)
-            if dcol < 0:
-                f_d[0:(N1-drow),(-dcol):(N2)] = f[(drow):(N1),0:(N2+dcol)]
-                mask_d[0:(N1-drow),(-dcol):(N2)] = mask[(drow):(N1),0:(N2+dcol)]
-            else:
-                f_d[0:(N1-drow),0:(N2-dcol)] = f[(drow):(N1),(dcol):(N2)]
-                mask_d[0:(N1-drow),0:(N2-dcol)] = mask[(drow):(N1),(dcol):(N2)]
-                            
-            # Find mask to exclude pixels outside mask 
-            mask_common = np.multiply(mask,mask_d)
-                
-            n = sum(sum(mask_common))
-            f_mean = sum(sum(np.multiply(f,mask_common)))/n;
-                
-            # Compute CON, COV, DSS
-            CON[row,col] = sum(sum(np.multiply((f-f_d),mask_common)**2))/n
-            temp = np.multiply((f-f_mean),(f_d-f_mean))
-            COV[row,col] = sum(sum(np.multiply(mask_common,temp)))/n
-            DSS[row,col] = sum(sum(abs(np.multiply((f-f_d),mask_common))))/n
+    
+    # Pixels outside mask do not count: crop to the bounding box of the mask
+    rows, cols = np.nonzero(mask)
+    if rows.size:
+        f = f[rows.min():rows.max()+1, cols.min():cols.max()+1]
+        mask = mask[rows.min():rows.max()+1, cols.min():cols.max()+1]
+    N1 = f.shape[0]
+    
+    # DSS and number of pixel pairs; pixels shifted in from outside the 
+    # image are outside mask
+    n = np.zeros((Lr+1,2*Lc+1),np.double)
+    f_pad = np.pad(f, ((0,0),(Lc,Lc)))
+    mask_pad = np.pad(mask, ((0,0),(Lc,Lc)))
+    for drow in range(min(Lr+1,N1)):
+        # All column offsets of this row offset at once: f_d[x,y,col] is the
+        # pixel shifted by drow, dcol = col - Lc (a view, no copies)
+        f_d = sliding_window_view(f_pad[drow:N1], 2*Lc+1, axis=1)
+        mask_d = sliding_window_view(mask_pad[drow:N1], 2*Lc+1, axis=1)
+        mask_common = mask[0:(N1-drow),:,np.newaxis] * mask_d
+        n[drow] = mask_common.sum((0,1))
+        diff = f[0:(N1-drow),:,np.newaxis] - f_d
+        diff *= mask_common
+        DSS[drow] = np.abs(diff, out=diff).sum((0,1))
+    DSS /= n
+    
+    # CON and COV of all offsets at once, from correlations of g*m, m^2,
+    # g*m^2 and g^2*m^2 (g = f - c, centered for accuracy)
+    c = (f*mask).sum() / mask.sum() if mask.any() else 0
+    g = f - c
+    m2 = mask**2
+    corr = _correlate([mask, g*mask, m2, g*m2, g**2*m2], 
+                      [(1,0), (0,1), (1,1), (4,2), (3,3), (2,4)], Lr, Lc)
+    g_mean = corr[0] / n
+    CON[:] = (corr[3] - 2*corr[4] + corr[5]) / n
+    CON[0,Lc] = 0 # zero offset, exactly
+    COV[:] = (corr[2] - g_mean * corr[1]) / n
         
     # 4) Set first half on first row to zero to preserve symmetry
     CON[0,0:Lc] = 0
@@ -100,8 +123,8 @@ def sfm_features(f, mask, Lr=4, Lc=4):
     labels = ["SFM_Coarseness","SFM_Contrast","SFM_Periodicity","SFM_Roughness"]
     
     # 2) Parameters
-    f = np.array(f, np.double)
-    mask = np.array(mask, np.double)
+    f = np.asarray(f, np.double)
+    mask = np.asarray(mask, np.double)
     Ng = 256
          
     # 3) Calculate CON, COV, DSS
@@ -2,10 +2,10 @@
 
 import numpy as np
 import math
-import cv2
+import contextvars
 
 __all__ = ['_energy', '_entropy', '_next_power_of_two', '_pad_image_power_2',
-           'pad_image', '_zero_runs']
+           'pad_image', '_zero_runs', '_map']
 
 def _energy(x):
     return np.multiply(x,x).sum()
@@ -14,6 +14,7 @@ def _entropy(x):
     return -np.multiply(x, np.log(x+1e-16)).sum()
 
 def pad_image(f, pad=2, fill_val=255):
+    import cv2
     TDLU=[1, 1, 1, 1]  #top, down, left, right pad
     out = f.copy()
     for _ in range(pad):
@@ -21,28 +22,34 @@ def pad_image(f, pad=2, fill_val=255):
                                  cv2.BORDER_CONSTANT, None, fill_val)
     return out
 
+def _map(function, iterable, executor=None):
+    # Apply function to each item, on executor if given (e.g. a thread pool).
+    # Each task runs in a copy of the caller's context, so that it sees the
+    # active profile, stage and cache.
+    if executor is None:
+        return [function(x) for x in iterable]
+    context = contextvars.copy_context()
+    return list(executor.map(lambda x: context.copy().run(function, x), iterable))
+
 def _next_power_of_two(n):
     math.ceil(math.log(n,2))
     return 2 ** math.ceil(math.log(n,2))
 
 def _pad_image_power_2(f):
-    N1, N2 = f.shape
+    # Pads the last two axes, so a stack of images K x N1 x N2 works as well
+    N1, N2 = f.shape[-2:]
     N1_deficit = _next_power_of_two(N1) - N1
     N2_deficit = _next_power_of_two(N2) - N2
-    f2 = np.pad(f, ((math.floor(N1_deficit/2),N1_deficit-math.floor(N1_deficit/2)), 
+    f2 = np.pad(f, ((0,0),) * (f.ndim-2) +
+                   ((math.floor(N1_deficit/2),N1_deficit-math.floor(N1_deficit/2)), 
                     (math.floor(N2_deficit/2),N2_deficit-math.floor(N2_deficit/2))), 
                 mode='constant')
     return f2
 
 def _image_xor(f):
     # Turn "0" to "1" and vice versa: XOR with image consisting of "1"s
-    f = f.astype(np.uint8)
-    mask = np.ones(f.shape, np.uint8)
-    out = np.zeros(f.shape, np.uint8)
-    for i in range(f.shape[0]):
-        for j in range(f.shape[1]):
-            out[i,j] = f[i,j] ^ mask[i,j]
-    return out
+    f = f.astype(np.uint8, copy=False)
+    return np.bitwise_xor(f, np.uint8(1))
 
 def _zero_runs(img, dimension):
     out = []